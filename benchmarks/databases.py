@@ -0,0 +1,27 @@
+import os
+from typing import Callable
+
+from sqlalchemy import Engine
+
+from src.engines import mysql_engine_factory, postgres_engine_factory
+
+
+# benchmarks wipe tables, so server engines run only on databases dedicated to them, never on the configured ones
+BENCHMARK_URL_VARIABLES: dict[str, str] = {
+    "mysql": "BENCHMARK_MYSQL_URL",
+    "postgres": "BENCHMARK_POSTGRES_URL",
+}
+
+_SERVER_ENGINE_FACTORIES: dict[str, Callable[[str], Engine]] = {
+    "mysql": mysql_engine_factory,
+    "postgres": postgres_engine_factory,
+}
+
+
+def benchmark_engine_factory(engine_name: str) -> Callable[[], Engine] | None:
+    """Factory of the benchmark database of a server engine, None when its environment variable is not set"""
+    url = os.environ.get(BENCHMARK_URL_VARIABLES[engine_name])
+    if not url:
+        return None
+
+    return lambda: _SERVER_ENGINE_FACTORIES[engine_name](url)
@@ -0,0 +1,106 @@
+import argparse
+import random
+import time
+
+from sqlalchemy import Engine, delete, insert, select, text
+
+from src.migrations import create_missing_indexes
+from src.tables import Base, Customer, Order, Product
+from src.templates import DatabaseTemplate
+
+
+def seed_without_indexes(engine: Engine, customers: int, products: int, orders: int, seed: int = 0) -> None:
+    """Database as it was before indexes were added to the schema"""
+    randomizer = random.Random(seed)
+
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                connection.execute(text(f"DROP INDEX {index.name}"))
+
+        connection.execute(
+            insert(Customer),
+            [{"id": _id, "full_name": f"Customer {_id}", "email": f"customer{_id}@shop.com"} for _id in range(1, customers + 1)],
+        )
+        connection.execute(
+            insert(Product),
+            [{"id": _id, "name": f"Product {_id}", "price": 1 + _id % 100} for _id in range(1, products + 1)],
+        )
+        connection.execute(
+            insert(Order),
+            [
+                {
+                    "id": _id,
+                    "qty": randomizer.randint(1, 5),
+                    "customer_id": randomizer.randint(1, customers),
+                    "product_id": randomizer.randint(1, products),
+                }
+                for _id in range(1, orders + 1)
+            ],
+        )
+
+
+def run_workloads(engine: Engine, customers: int, operations: int, seed: int = 0) -> dict[str, float]:
+    """Operations per second of each workload"""
+    ids = random.Random(seed).sample(range(1, customers + 1), operations)
+
+    return {
+        "email_lookup": operations / _timed(_lookup_by_email, engine, ids),
+        "customer_orders_join": operations / _timed(_customer_orders, engine, ids),
+        "cascade_delete": operations / _timed(_delete_customers, engine, ids),
+    }
+
+
+def _timed(function, *args) -> float:
+    started_at = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - started_at
+
+
+def _lookup_by_email(engine: Engine, ids: list[int]) -> None:
+    with engine.connect() as connection:
+        for _id in ids:
+            connection.execute(select(Customer.id).where(Customer.email == f"customer{_id}@shop.com")).all()
+
+
+def _customer_orders(engine: Engine, ids: list[int]) -> None:
+    query = select(Order.id, Order.qty, Product.name, Product.price).join(Product, Order.product_id == Product.id)
+
+    with engine.connect() as connection:
+        for _id in ids:
+            connection.execute(query.where(Order.customer_id == _id)).all()
+
+
+def _delete_customers(engine: Engine, ids: list[int]) -> None:
+    """Transaction per customer, its orders are removed by ON DELETE CASCADE"""
+    for _id in ids:
+        with engine.begin() as connection:
+            connection.execute(delete(Customer).where(Customer.id == _id))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares lookups, joins and cascade deletes before and after indexing")
+    parser.add_argument("--customers", type=int, default=5000)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--operations", type=int, default=200)
+    arguments = parser.parse_args()
+
+    template = DatabaseTemplate(
+        lambda engine: seed_without_indexes(engine, arguments.customers, arguments.products, arguments.orders)
+    )
+
+    print(f"{'':<8} {'email lookups/s':>16} {'joins/s':>10} {'cascade deletes/s':>18}")
+
+    for phase in ("before", "after"):
+        engine = template.clone()
+
+        if phase == "after":
+            create_missing_indexes(engine)
+
+        result = run_workloads(engine, arguments.customers, arguments.operations)
+        print(
+            f"{phase:<8} {result['email_lookup']:>16,.0f} {result['customer_orders_join']:>10,.0f} "
+            f"{result['cascade_delete']:>18,.0f}"
+        )
+        engine.dispose()
@@ -0,0 +1,206 @@
+import argparse
+import itertools
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import Engine
+
+from benchmarks.databases import BENCHMARK_URL_VARIABLES, benchmark_engine_factory
+from benchmarks.results import percentile, write_results
+from src.constants import ORDERS_PAGE_SIZE
+from src.engines import ENGINE_FACTORIES, SQLITE_PROFILES, sqlite_engine_factory
+from src.exceptions import InfrastructureException
+from src.export import recreate_tables
+from src.generator import generate_into_engine
+from src.repositories import CustomerRepository, OrderRepository, ProductRepository
+
+
+OPERATIONS = ("browse_customers", "browse_orders", "view_customer", "add_order", "update_product")
+DEFAULT_MIX = "browse_customers=2,browse_orders=4,view_customer=6,add_order=3,update_product=1"
+
+# substrings of driver errors caused by concurrent transactions rather than by bad input
+_CONFLICT_MARKERS = ("deadlock", "database is locked", "lock wait timeout", "could not serialize")
+
+
+class Clerk:
+    """Operations one clerk does through the UI, every clerk has its own repositories and random generator"""
+
+    def __init__(self, engine: Engine, customers: int, products: int, order_ids: itertools.count, seed: int) -> None:
+        self._customers = CustomerRepository(engine)
+        self._products = ProductRepository(engine)
+        self._orders = OrderRepository(engine)
+        self._customer_count = customers
+        self._product_count = products
+        self._order_ids = order_ids
+        self._randomizer = random.Random(seed)
+
+    def browse_customers(self) -> None:
+        self._customers.get_all()
+
+    def browse_orders(self) -> None:
+        self._orders.get_order_views(ORDERS_PAGE_SIZE, self._randomizer.randrange(0, 10) * ORDERS_PAGE_SIZE)
+
+    def view_customer(self) -> None:
+        _id = self._randomizer.randint(1, self._customer_count)
+        self._customers.get_one(_id)
+        self._customers.get_stats(_id)
+
+    def add_order(self) -> None:
+        self._orders.add({
+            "id": next(self._order_ids),
+            "qty": self._randomizer.randint(1, 5),
+            "customer_id": self._randomizer.randint(1, self._customer_count),
+            "product_id": self._randomizer.randint(1, self._product_count),
+        })
+
+    def update_product(self) -> None:
+        _id = self._randomizer.randint(1, self._product_count)
+        self._products.update(_id, {"price": self._randomizer.randint(1, 500)})
+
+
+def parse_mix(mix: str) -> dict[str, int]:
+    weights = {}
+
+    for item in mix.split(","):
+        name, _, weight = item.partition("=")
+        weights[name.strip()] = int(weight or 1)
+
+    return weights
+
+
+def simulate(
+    engine: Engine,
+    clerks: int,
+    operations: int,
+    mix: dict[str, int],
+    customers: int,
+    products: int,
+    order_ids: itertools.count,
+    seed: int,
+) -> dict[str, Any]:
+    """Runs `operations` operations in every clerk thread at once, returns stats of this concurrency level"""
+    latencies: list[float] = []
+    failures = {"errors": 0, "conflicts": 0}
+    lock = threading.Lock()
+    start = threading.Barrier(clerks)
+
+    def run_clerk(number: int) -> None:
+        clerk = Clerk(engine, customers, products, order_ids, seed * 1000 + number)
+        names = list(mix)
+        picked = random.Random(seed * 1000 + number).choices(names, [mix[name] for name in names], k=operations)
+        clerk_latencies = []
+        start.wait()
+
+        for name in picked:
+            started_at = time.perf_counter()
+
+            try:
+                getattr(clerk, name)()
+            except InfrastructureException as err:
+                with lock:
+                    failures["conflicts" if _is_conflict(err) else "errors"] += 1
+                continue
+
+            clerk_latencies.append(time.perf_counter() - started_at)
+
+        with lock:
+            latencies.extend(clerk_latencies)
+
+    threads = [threading.Thread(target=run_clerk, args=(number,)) for number in range(clerks)]
+    started_at = time.perf_counter()
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - started_at
+    total = clerks * operations
+
+    return {
+        "clerks": clerks,
+        "operations": total,
+        "ops_per_second": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.5) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "error_rate": failures["errors"] / total,
+        "conflict_rate": failures["conflicts"] / total,
+    }
+
+
+def _is_conflict(err: InfrastructureException) -> bool:
+    message = str(err).lower()
+    return any(marker in message for marker in _CONFLICT_MARKERS)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulates clerks working with the shop at the same time")
+    parser.add_argument(
+        "--engine",
+        choices=sorted(ENGINE_FACTORIES),
+        default="sqlite",
+        help="sqlite runs on a temporary file, postgres and mysql on databases of BENCHMARK_POSTGRES_URL and "
+        "BENCHMARK_MYSQL_URL, their tables are WIPED",
+    )
+    parser.add_argument("--sqlite-profile", choices=sorted(SQLITE_PROFILES), default="interactive")
+    parser.add_argument("--clerks", nargs="+", type=int, default=[1, 2, 4, 8], help="concurrency levels")
+    parser.add_argument("--operations", type=int, default=200, help="operations of every clerk on each level")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="weights of operations, like add_order=3,view_customer=6")
+    parser.add_argument("--customers", type=int, default=2000)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="file for JSON results")
+    arguments = parser.parse_args()
+
+    mix = parse_mix(arguments.mix)
+    unknown = set(mix) - set(OPERATIONS)
+    if unknown:
+        parser.error(f"unknown operations {', '.join(sorted(unknown))}, choose from {', '.join(OPERATIONS)}")
+
+    engine_factory = None if arguments.engine == "sqlite" else benchmark_engine_factory(arguments.engine)
+    if arguments.engine != "sqlite" and engine_factory is None:
+        parser.error(f"set {BENCHMARK_URL_VARIABLES[arguments.engine]} to a database the simulation may wipe")
+
+    dataset = (arguments.customers, arguments.products, arguments.orders)
+
+    with tempfile.TemporaryDirectory() as directory:
+        if arguments.engine == "sqlite":
+            engine = sqlite_engine_factory(f"sqlite:///{Path(directory) / 'load.sqlite'}", arguments.sqlite_profile)
+        else:
+            engine = engine_factory()
+
+        recreate_tables(engine)
+        generate_into_engine(engine, *dataset, arguments.seed, workers=1)
+
+        print(f"{'clerks':>6} {'ops/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8} {'conflicts':>10}")
+        results = []
+        # ids of added orders are unique across clerks and levels
+        order_ids = itertools.count(arguments.orders + 1)
+
+        for level, clerks in enumerate(arguments.clerks):
+            result = simulate(
+                engine,
+                clerks,
+                arguments.operations,
+                mix,
+                arguments.customers,
+                arguments.products,
+                order_ids,
+                arguments.seed + level,
+            )
+            results.append(result)
+            print(
+                f"{clerks:>6} {result['ops_per_second']:>10,.1f} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+                f"{result['p99_ms']:>9.2f} {result['error_rate']:>8.2%} {result['conflict_rate']:>10.2%}"
+            )
+
+        engine.dispose()
+
+    if arguments.output is not None:
+        write_results(arguments.output, results)
@@ -0,0 +1,118 @@
+import argparse
+import gc
+import sys
+import tracemalloc
+from typing import Any, Callable
+
+from sqlalchemy import Engine
+
+from benchmarks.results import write_results
+from src.engines import memory_engine_factory
+from src.export import export_data
+from src.generator import generate_into_engine
+from src.repositories import CustomerRepository, OrderRepository, ProductRepository
+from src.templates import DatabaseTemplate
+
+
+def measure(function: Callable[[], Any]) -> tuple[int, int]:
+    """Peak memory allocated while the function runs and memory still held by its result, in bytes"""
+    gc.collect()
+    tracemalloc.start()
+
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        result = function()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    del result
+    return peak - before, retained - before
+
+
+def run_paths(engine: Engine, size: int) -> list[tuple[str, int, Callable[[], Any]]]:
+    """Measured paths as name, number of rows they go through and the call itself"""
+    customers = CustomerRepository(engine)
+    products = ProductRepository(engine)
+    orders = OrderRepository(engine)
+    all_rows = size + max(1, size // 10) + size
+
+    return [
+        ("customer.get_all", size, customers.get_all),
+        ("product.get_all", max(1, size // 10), products.get_all),
+        ("order.get_all", size, orders.get_all),
+        ("customer.get_many", size, lambda: customers.get_many(range(1, size + 1))),
+        ("order.get_order_views", size, lambda: orders.get_order_views(size, 0)),
+        ("export_data", all_rows, lambda: _export(engine, incremental=False)),
+        ("export_data incremental", all_rows, lambda: _export(engine, incremental=True)),
+    ]
+
+
+def _export(engine: Engine, incremental: bool) -> None:
+    # destination is dropped before measuring ends, so memory of earlier runs doesn't count towards later ones
+    destination = memory_engine_factory()
+
+    try:
+        export_data(engine, destination, incremental)
+    finally:
+        destination.dispose()
+
+
+def run_harness(sizes: list[int], seed: int = 0) -> list[dict[str, Any]]:
+    results = []
+
+    for size in sizes:
+        template = DatabaseTemplate(
+            lambda engine: generate_into_engine(engine, size, max(1, size // 10), size, seed, workers=1)
+        )
+        engine = template.clone()
+
+        for name, rows, function in run_paths(engine, size):
+            peak, retained = measure(function)
+            results.append({
+                "path": name,
+                "size": size,
+                "rows": rows,
+                "peak_bytes": peak,
+                "retained_bytes": retained,
+                "peak_bytes_per_row": peak / rows,
+                "retained_bytes_per_row": retained / rows,
+            })
+            print(
+                f"{name:<26} {size:>8} {peak / rows / 1024:>14.2f} {retained / rows / 1024:>18.2f}",
+                file=sys.stderr,
+            )
+
+        engine.dispose()
+        template.dispose()
+
+    return results
+
+
+def over_budget(results: list[dict[str, Any]], budget_bytes_per_row: float) -> list[str]:
+    return [
+        f"{result['path']} {result['size']}: peak {result['peak_bytes_per_row'] / 1024:.2f} KiB per row"
+        for result in results
+        if result["peak_bytes_per_row"] > budget_bytes_per_row
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measures memory per row of read paths and export strategies")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[500, 2000, 8000])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--budget-kib", type=float, default=16.0, help="allowed peak memory per row, in KiB")
+    parser.add_argument("--output", help="file for JSON results")
+    arguments = parser.parse_args()
+
+    print(f"{'path':<26} {'size':>8} {'peak KiB/row':>14} {'retained KiB/row':>18}", file=sys.stderr)
+    results = run_harness(arguments.sizes, arguments.seed)
+
+    if arguments.output is not None:
+        write_results(arguments.output, results)
+
+    failures = over_budget(results, arguments.budget_kib * 1024)
+    for failure in failures:
+        print(f"Over budget of {arguments.budget_kib} KiB per row: {failure}")
+
+    sys.exit(1 if failures else 0)
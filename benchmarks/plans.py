@@ -0,0 +1,223 @@
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import Engine, event
+
+from benchmarks.databases import BENCHMARK_URL_VARIABLES, benchmark_engine_factory
+from src.exceptions import InfrastructureException
+from src.export import recreate_tables
+from src.generator import generate_into_engine
+from src.instrumentation import fingerprint
+from src.reports import OrderReports
+from src.repositories import CustomerRepository, OrderRepository, ProductRepository
+from src.tables import Base
+from src.templates import DatabaseTemplate
+
+
+SNAPSHOTS_DIRECTORY = Path(__file__).resolve().parent / "plans"
+
+_EXPLAINED_STATEMENTS = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+_SQLITE_FULL_SCAN = re.compile(r"^\s*SCAN (\w+)(?! USING (?:COVERING )?INDEX)(?! VIRTUAL TABLE)")
+_POSTGRES_FULL_SCAN = re.compile(r"^\s*Seq Scan on (\w+)")
+# SQLite picks any of equally small covering indexes to scan a whole table, e.g. for count(*)
+_SQLITE_COVERING_INDEX_SCAN = re.compile(r"^(\s*SCAN \w+ USING COVERING INDEX) \w+$")
+
+
+def capture_statements(engine: Engine) -> dict[str, tuple[str, Any]]:
+    """Runs every repository and report query once, returns their statements and parameters by fingerprint"""
+    statements = {}
+
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        if _EXPLAINED_STATEMENTS.match(statement):
+            statements.setdefault(fingerprint(statement), (statement, parameters[0] if executemany else parameters))
+
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+    try:
+        _run_workload(engine)
+    finally:
+        event.remove(engine, "after_cursor_execute", _after_cursor_execute)
+
+    return statements
+
+
+def explain(engine: Engine, statement: str, parameters: Any) -> list[str]:
+    """Plan as lines of operations indented by nesting, without costs and row estimates that vary between runs"""
+    dialect_name = engine.dialect.name
+
+    with engine.connect() as connection:
+        if dialect_name == "sqlite":
+            rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            depths = {0: -1}
+            lines = []
+
+            for node_id, parent_id, _, detail in rows:
+                depths[node_id] = depths.get(parent_id, -1) + 1
+                lines.append(_SQLITE_COVERING_INDEX_SCAN.sub(r"\1", "  " * depths[node_id] + detail))
+
+            return lines
+
+        if dialect_name == "postgresql":
+            plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters).scalar()
+            plan = json.loads(plan) if isinstance(plan, str) else plan
+            return _postgres_plan_lines(plan[0]["Plan"], 0)
+
+        raise InfrastructureException(f"Plans of {dialect_name} dialect are not supported")
+
+
+def capture_plans(engine: Engine) -> dict[str, list[str]]:
+    return {
+        key: explain(engine, statement, parameters)
+        for key, (statement, parameters) in sorted(capture_statements(engine).items())
+    }
+
+
+def full_scans(plan: list[str]) -> set[str]:
+    """Shop tables read in whole, scans of subqueries and of full text indexes are not counted"""
+    scans = set()
+
+    for line in plan:
+        match = _SQLITE_FULL_SCAN.match(line) or _POSTGRES_FULL_SCAN.match(line)
+        if match and match.group(1) in Base.metadata.tables:
+            scans.add(match.group(1))
+
+    return scans
+
+
+def check(plans: dict[str, list[str]], snapshot: dict[str, list[str]]) -> list[str]:
+    """Differences against approved plans, new full table scans are called out"""
+    problems = []
+
+    for key, plan in plans.items():
+        approved = snapshot.get(key)
+
+        if approved is None:
+            problems.append(f"Not approved query: {key}\n" + _indent(plan))
+            continue
+        if plan == approved:
+            continue
+
+        new_scans = full_scans(plan) - full_scans(approved)
+        title = f"New full scan of {', '.join(sorted(new_scans))}" if new_scans else "Changed plan"
+        problems.append(f"{title}: {key}\n  approved:\n{_indent(approved, 2)}\n  current:\n{_indent(plan, 2)}")
+
+    for key in snapshot.keys() - plans.keys():
+        problems.append(f"Approved query is not issued anymore: {key}")
+
+    return problems
+
+
+def snapshot_path(engine: Engine) -> Path:
+    return SNAPSHOTS_DIRECTORY / f"{engine.dialect.name}.json"
+
+
+def _run_workload(engine: Engine) -> None:
+    customers = CustomerRepository(engine)
+    products = ProductRepository(engine)
+    orders = OrderRepository(engine)
+
+    for repository, new_record, changes in (
+        (customers, {"id": 10_001, "full_name": "Plan Customer", "email": "plan@shop.com"}, {"full_name": "Plan"}),
+        (products, {"id": 10_001, "name": "Plan Product", "price": 10.0, "description": None}, {"price": 11.0}),
+        (orders, {"id": 10_001, "qty": 1, "customer_id": 1, "product_id": 1}, {"qty": 2}),
+    ):
+        repository.get_all()
+        repository.get_one(1)
+        repository.exists(1)
+        repository.count()
+        repository.get_many([1, 2, 3])
+        repository.get_page(50, 10)
+        repository.get_page(50, before_id=100)
+        repository.add(new_record)
+        repository.update(new_record["id"], changes)
+        repository.upsert_many([new_record])
+        repository.delete(new_record["id"])
+
+    orders.count({"customer_id": 1})
+    orders.get_order_views(100, 100)
+    orders.get_order_views(100, after_id=100)
+    orders.get_order_views(100, before_id=200)
+
+    for repository in (customers, products):
+        repository.get_stats(1)
+        repository.search("plan")
+
+    customers.fuzzy_search("plan")
+
+    reports = OrderReports(engine)
+    for ranges in ({}, {"order_ids": (1, 100), "customer_ids": (1, 50), "product_ids": (1, 10)}):
+        reports.revenue_per_product(**ranges)
+        reports.orders_per_customer(**ranges)
+        reports.top_customers(5, **ranges)
+
+
+def _postgres_plan_lines(node: dict[str, Any], depth: int) -> list[str]:
+    line = node["Node Type"]
+    if "Relation Name" in node:
+        line += f" on {node['Relation Name']}"
+    if "Index Name" in node:
+        line += f" using {node['Index Name']}"
+
+    lines = ["  " * depth + line]
+    for child in node.get("Plans", []):
+        lines.extend(_postgres_plan_lines(child, depth + 1))
+
+    return lines
+
+
+def _indent(lines: list[str], depth: int = 1) -> str:
+    return "\n".join("  " * depth + line for line in lines)
+
+
+def plan_engine(engine_name: str) -> Engine | None:
+    """
+        Generated database plans are captured on, SQLite is in memory, Postgres is the dedicated benchmark database.
+        None when the benchmark database is not set.
+    """
+    if engine_name == "sqlite":
+        return DatabaseTemplate(lambda engine: generate_into_engine(engine, 200, 20, 500, workers=1)).clone()
+
+    engine_factory = benchmark_engine_factory(engine_name)
+    if engine_factory is None:
+        return None
+
+    engine = engine_factory()
+    recreate_tables(engine)
+    generate_into_engine(engine, 200, 20, 500, workers=1)
+    return engine
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares query plans of repositories and reports with approved ones")
+    parser.add_argument("command", choices=["check", "approve"])
+    parser.add_argument(
+        "--engine",
+        choices=["sqlite", "postgres"],
+        default="sqlite",
+        help="postgres runs on the database of BENCHMARK_POSTGRES_URL, its tables are WIPED and filled with new rows",
+    )
+    arguments = parser.parse_args()
+
+    engine = plan_engine(arguments.engine)
+    if engine is None:
+        parser.error(f"set {BENCHMARK_URL_VARIABLES[arguments.engine]} to a database plans may be captured on")
+    plans = capture_plans(engine)
+    path = snapshot_path(engine)
+
+    if arguments.command == "approve":
+        path.write_text(json.dumps(plans, indent=2) + "\n")
+        print(f"Approved {len(plans)} plans in {path}")
+        sys.exit(0)
+
+    snapshot = json.loads(path.read_text()) if path.exists() else {}
+    problems = check(plans, snapshot)
+
+    for problem in problems:
+        print(problem, end="\n\n")
+
+    print(f"{len(problems)} of {len(plans)} plans differ from approved ones" if problems else f"All {len(plans)} plans match")
+    sys.exit(1 if problems else 0)
@@ -0,0 +1,51 @@
+import json
+import os
+import platform
+import subprocess
+import time
+from pathlib import Path
+from typing import Any
+
+import sqlalchemy
+
+
+def machine_metadata() -> dict[str, Any]:
+    """Describes where results were measured, results of different machines are not comparable"""
+    return {
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "commit": _git_commit(),
+    }
+
+
+def write_results(path: str | Path, results: list[dict[str, Any]]) -> None:
+    with open(path, "w") as file:
+        json.dump({"metadata": machine_metadata(), "results": results}, file, indent=2)
+
+
+def read_results(path: str | Path) -> dict[str, Any]:
+    with open(path) as file:
+        return json.load(file)
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    """Nearest rank percentile, `fraction` is from 0 to 1"""
+    if not values:
+        return 0.0
+
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
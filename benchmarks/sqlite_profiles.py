@@ -0,0 +1,90 @@
+import argparse
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import Engine, insert, select
+
+from src.engines import SQLITE_PROFILES, sqlite_engine_factory
+from src.tables import Base, Customer
+
+
+SOURCE_DATABASE = Path(__file__).resolve().parent.parent / "shop-database.sqlite"
+# first id of inserted customers, far above ids of the source database
+_FIRST_ID = 1_000_000
+
+
+def run_profile(database: Path, profile: str | None, single_rows: int, bulk_rows: int, scans: int) -> dict[str, float]:
+    """Rows per second of each workload, measured on the given database file"""
+    engine = sqlite_engine_factory(f"sqlite:///{database}", profile)
+
+    try:
+        Base.metadata.create_all(engine)
+
+        return {
+            "single_row_inserts": single_rows / _timed(_insert_one_by_one, engine, _FIRST_ID, single_rows),
+            "bulk_insert": bulk_rows / _timed(_insert_in_one_transaction, engine, _FIRST_ID + single_rows, bulk_rows),
+            "scan": scans * (single_rows + bulk_rows) / _timed(_scan, engine, scans),
+        }
+    finally:
+        engine.dispose()
+
+
+def _timed(function, *args) -> float:
+    started_at = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - started_at
+
+
+def _customers(first_id: int, count: int) -> list[dict]:
+    return [
+        {"id": _id, "full_name": f"Customer {_id}", "email": f"customer{_id}@shop.com"}
+        for _id in range(first_id, first_id + count)
+    ]
+
+
+def _insert_one_by_one(engine: Engine, first_id: int, count: int) -> None:
+    """Transaction per row, like the UI does"""
+    for customer in _customers(first_id, count):
+        with engine.begin() as connection:
+            connection.execute(insert(Customer), customer)
+
+
+def _insert_in_one_transaction(engine: Engine, first_id: int, count: int) -> None:
+    with engine.begin() as connection:
+        connection.execute(insert(Customer), _customers(first_id, count))
+
+
+def _scan(engine: Engine, scans: int) -> None:
+    # sorting by a column without index goes through temp store
+    query = select(Customer.id, Customer.full_name, Customer.email).order_by(Customer.email)
+
+    with engine.connect() as connection:
+        for _ in range(scans):
+            for _ in connection.execute(query):
+                pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compares SQLite profiles on copies of shop-database.sqlite, the database itself is not modified"
+    )
+    parser.add_argument("--single-rows", type=int, default=1000)
+    parser.add_argument("--bulk-rows", type=int, default=100_000)
+    parser.add_argument("--scans", type=int, default=5)
+    arguments = parser.parse_args()
+
+    print(f"{'profile':<12} {'single row inserts/s':>22} {'bulk inserts/s':>16} {'scanned rows/s':>16}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        for profile in [None, *SQLITE_PROFILES]:
+            # every profile starts from a fresh copy, so WAL files and inserted rows of others don't count
+            database = Path(directory) / f"{profile or 'default'}.sqlite"
+            shutil.copyfile(SOURCE_DATABASE, database)
+
+            result = run_profile(database, profile, arguments.single_rows, arguments.bulk_rows, arguments.scans)
+            print(
+                f"{profile or 'default':<12} {result['single_row_inserts']:>22,.0f} "
+                f"{result['bulk_insert']:>16,.0f} {result['scan']:>16,.0f}"
+            )
@@ -0,0 +1,202 @@
+import argparse
+import random
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from sqlalchemy import Engine, text
+
+from benchmarks.databases import BENCHMARK_URL_VARIABLES, benchmark_engine_factory
+from benchmarks.results import percentile, read_results, write_results
+from src.engines import ENGINE_FACTORIES, memory_engine_factory, sqlite_engine_factory
+from src.export import export_data, recreate_tables
+from src.generator import generate_into_engine
+from src.repositories import CustomerRepository, OrderRepository, ProductRepository
+from src.repositories.abstract import IRepository
+
+
+# records written by add and changes made by update, ids of added records start after the dataset
+_NEW_RECORDS: dict[type[IRepository], tuple[Callable[[int], dict[str, Any]], dict[str, Any]]] = {
+    CustomerRepository: (
+        lambda _id: {"id": _id, "full_name": f"Bench Customer {_id}", "email": f"bench{_id}@shop.com"},
+        {"full_name": "Bench Customer"},
+    ),
+    ProductRepository: (
+        lambda _id: {"id": _id, "name": f"Bench Product {_id}", "price": 10.0, "description": None},
+        {"price": 11.0},
+    ),
+    OrderRepository: (
+        lambda _id: {"id": _id, "qty": 1, "customer_id": 1, "product_id": 1},
+        {"qty": 2},
+    ),
+}
+
+
+def run_suite(engine_names: list[str], sizes: list[int], operations: int, seed: int = 0) -> list[dict[str, Any]]:
+    results = []
+
+    for engine_name in engine_names:
+        for size in sizes:
+            if engine_name != "sqlite" and benchmark_engine_factory(engine_name) is None:
+                print(f"{BENCHMARK_URL_VARIABLES[engine_name]} is not set, {engine_name} skipped", file=sys.stderr)
+                break
+
+            with _benchmark_engine(engine_name) as engine:
+                if engine is None:
+                    print(f"{engine_name} is not reachable, skipped", file=sys.stderr)
+                    break
+
+                results.extend(_run_dataset(engine_name, engine, size, operations, seed))
+
+    return results
+
+
+def compare(baseline: dict[str, Any], current: dict[str, Any], threshold: float) -> list[str]:
+    """Regressions of throughput or p95 latency above `threshold` fraction, for measurements present in both"""
+    baseline_results = {_result_key(result): result for result in baseline["results"]}
+    regressions = []
+
+    for result in current["results"]:
+        previous = baseline_results.get(_result_key(result))
+        if previous is None:
+            continue
+
+        name = "{engine} {size} {operation}".format(**result)
+
+        if result["ops_per_second"] < previous["ops_per_second"] * (1 - threshold):
+            regressions.append(
+                f"{name}: throughput {previous['ops_per_second']:,.1f} -> {result['ops_per_second']:,.1f} ops/s"
+            )
+        if result["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+            regressions.append(f"{name}: p95 latency {previous['p95_ms']:.3f} -> {result['p95_ms']:.3f} ms")
+
+    return regressions
+
+
+@contextmanager
+def _benchmark_engine(engine_name: str) -> Iterator[Engine | None]:
+    """
+        SQLite benchmarks run on a temporary file, so the shop database is left alone.
+        Postgres and MySQL run on dedicated benchmark databases, their tables are wiped. None when not reachable.
+    """
+    if engine_name == "sqlite":
+        with tempfile.TemporaryDirectory() as directory:
+            engine = sqlite_engine_factory(f"sqlite:///{Path(directory) / 'benchmark.sqlite'}")
+            try:
+                yield engine
+            finally:
+                engine.dispose()
+        return
+
+    try:
+        engine = benchmark_engine_factory(engine_name)()
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except Exception:  # missing driver or server, error differs from one driver to another
+        yield None
+        return
+
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+def _run_dataset(engine_name: str, engine: Engine, size: int, operations: int, seed: int) -> list[dict[str, Any]]:
+    products = max(1, size // 10)
+    recreate_tables(engine)
+    generate_into_engine(engine, size, products, size, seed, workers=1)
+
+    randomizer = random.Random(seed)
+    results = []
+
+    def record(operation: str, latencies: list[float], rows: int | None = None) -> None:
+        total = sum(latencies)
+        results.append({
+            "engine": engine_name,
+            "size": size,
+            "operation": operation,
+            "ops_per_second": len(latencies) / total if total else 0.0,
+            "rows_per_second": rows / total if rows is not None and total else None,
+            "p50_ms": percentile(latencies, 0.5) * 1000,
+            "p95_ms": percentile(latencies, 0.95) * 1000,
+        })
+        print(f"{engine_name} {size} {operation}: {results[-1]['ops_per_second']:,.1f} ops/s", file=sys.stderr)
+
+    for repository_class, (new_record, changes) in _NEW_RECORDS.items():
+        # no cache, so every call reaches the database
+        repository = repository_class(engine)
+        name = repository.table_name
+        table_size = products if repository_class is ProductRepository else size
+        existing_ids = [randomizer.randint(1, table_size) for _ in range(operations)]
+        new_ids = range(size + 1, size + 1 + operations)
+
+        record(f"{name}.get_all", _latencies(repository.get_all, [()] * 3), rows=3 * len(repository.get_all()))
+        record(f"{name}.get_one", _latencies(repository.get_one, [(_id,) for _id in existing_ids]))
+        record(f"{name}.add", _latencies(repository.add, [(new_record(_id),) for _id in new_ids]))
+        record(f"{name}.update", _latencies(repository.update, [(_id, changes) for _id in new_ids]))
+        record(f"{name}.delete", _latencies(repository.delete, [(_id,) for _id in new_ids]))
+
+    for incremental in (False, True):
+        destination = memory_engine_factory()
+        operation = "export_data incremental" if incremental else "export_data"
+        record(operation, _latencies(export_data, [(engine, destination, incremental)]))
+        destination.dispose()
+
+    record("recreate_tables", _latencies(recreate_tables, [(engine,)]))
+    return results
+
+
+def _latencies(function: Callable, calls: list[tuple]) -> list[float]:
+    latencies = []
+
+    for arguments in calls:
+        started_at = time.perf_counter()
+        function(*arguments)
+        latencies.append(time.perf_counter() - started_at)
+
+    return latencies
+
+
+def _result_key(result: dict[str, Any]) -> tuple:
+    return result["engine"], result["size"], result["operation"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks repositories and export, tracks regressions")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="runs benchmarks and writes results as JSON")
+    run_parser.add_argument(
+        "--engines",
+        nargs="+",
+        choices=sorted(ENGINE_FACTORIES),
+        default=["sqlite"],
+        help="postgres and mysql run on databases of BENCHMARK_POSTGRES_URL and BENCHMARK_MYSQL_URL, "
+        "their tables are WIPED, skipped when not set or not reachable",
+    )
+    run_parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10_000])
+    run_parser.add_argument("--operations", type=int, default=200, help="calls of each point operation")
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--output", default="benchmark-results.json")
+
+    compare_parser = commands.add_parser("compare", help="fails when results regressed against the baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="allowed fraction of slowdown")
+
+    arguments = parser.parse_args()
+
+    if arguments.command == "run":
+        results = run_suite(arguments.engines, arguments.sizes, arguments.operations, arguments.seed)
+        write_results(arguments.output, results)
+    else:
+        regressions = compare(read_results(arguments.baseline), read_results(arguments.current), arguments.threshold)
+
+        for regression in regressions:
+            print(regression)
+
+        sys.exit(1 if regressions else 0)
@@ -1,30 +1,44 @@
+import argparse
+
+from src.config import (
+    INSTRUMENTATION_ENABLED,
+    QUERY_STATS_DUMP_PATH,
+    QUERY_STATS_DUMP_INTERVAL_SECONDS,
+    DEMO_FIXTURES_DIRECTORY,
+)
+from src.instrumentation import StatsDumper
+from src.schema import ensure_schema
 from src.ui import Window
 from src.export import recreate_tables
-from src.engines import mysql_engine_factory
-from src.repositories import CustomerRepository, ProductRepository, OrderRepository
+from src.engines import engines
+from src.fixtures import load_fixtures
 
 
-def _initialize_database() -> None:
-    engine = mysql_engine_factory()
+def _initialize_database(reset: bool) -> None:
+    engine = engines.get("mysql")
 
-    recreate_tables(engine)
-
-    customer_repository = CustomerRepository(engine)
-    product_repository = ProductRepository(engine)
-    order_repository = OrderRepository(engine)
+    ensure_schema(engine)
 
+    if not reset:
+        return
 
-    customer_repository.add({"id": 1, "full_name": "Nick", "email": "espozito@dog.com"})
-    customer_repository.add({"id": 2, "full_name": "John", "email": "foaspi@dog.com"})
+    recreate_tables(engine)
+    load_fixtures(engine, DEMO_FIXTURES_DIRECTORY)
 
-    product_repository.add({"id": 1, "name": "Ball", "price": 9.5, "description":"Ball for football"})
-    product_repository.add({"id": 2, "name": "Hog", "price": 15, "description":"Hog for farming"})
 
-    order_repository.add({"id": 1, "customer_id": 1, "product_id": 1, "qty": 1})
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Shop database managing system")
+    parser.add_argument("--reset", action="store_true", help="wipe all tables and fill them with demo records")
+    arguments = parser.parse_args()
 
+    if INSTRUMENTATION_ENABLED:
+        stats_dumper = StatsDumper(QUERY_STATS_DUMP_PATH, QUERY_STATS_DUMP_INTERVAL_SECONDS)
+        stats_dumper.start()
 
-if __name__ == "__main__":
-    _initialize_database()
+    _initialize_database(arguments.reset)
 
     window = Window()
     window.run()
+
+    if INSTRUMENTATION_ENABLED:
+        stats_dumper.stop()
@@ -0,0 +1,66 @@
+import contextvars
+import sys
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+import tkinter as tk
+
+
+class BackgroundRunner:
+    """
+        Runs database work on a thread pool, so the window doesn't freeze while it waits.
+
+        Tk is not thread safe, so callbacks get the finished future on the Tk thread, found by `after()` polling.
+        Callback is skipped when its owner widget is destroyed by then, e.g. after switching to another window.
+        A failing callback is reported like any other Tk callback error, callbacks after it still run.
+    """
+
+    def __init__(self, root: tk.Misc, workers: int, poll_ms: int) -> None:
+        self._root = root
+        self._poll_ms = poll_ms
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ui-worker")
+        self._pending: list[tuple[Future, Callable[[Future], Any], tk.Misc | None]] = []
+        self._polling = False
+
+    def submit(
+        self,
+        function: Callable[[], Any],
+        callback: Callable[[Future], Any],
+        owner: tk.Misc | None = None,
+    ) -> Future:
+        """Must be called from the Tk thread, function runs with a copy of the caller context"""
+        future = self._executor.submit(contextvars.copy_context().run, function)
+        self._pending.append((future, callback, owner))
+
+        if not self._polling:
+            self._polling = True
+            self._root.after(self._poll_ms, self._poll)
+
+        return future
+
+    def shutdown(self) -> None:
+        """Waits for running work, work that hasn't started yet is cancelled"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._pending.clear()
+
+    def _poll(self) -> None:
+        finished = []
+        still_running = []
+
+        # done() is checked once per future, so work finishing in between is not lost
+        for pending in self._pending:
+            (finished if pending[0].done() else still_running).append(pending)
+
+        self._pending = still_running
+
+        for future, callback, owner in finished:
+            if owner is None or owner.winfo_exists():
+                try:
+                    callback(future)
+                except Exception:
+                    self._root.report_callback_exception(*sys.exc_info())
+
+        if self._pending:
+            self._root.after(self._poll_ms, self._poll)
+        else:
+            self._polling = False
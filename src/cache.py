@@ -0,0 +1,133 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Hashable
+
+from src.config import CACHE_MAX_SIZE, CACHE_TTL_SECONDS
+
+
+_MISSING = object()
+
+# called with id of the engine after every repository write, results derived from many tables drop themselves
+_write_listeners: list[Callable[[int], None]] = []
+
+
+class LRUCache:
+    """
+        Thread safe LRU cache with per entry TTL, counts hits and misses.
+
+        Values loaded by `get_or_load` are not stored when their key was invalidated while the loader ran,
+        since the loader may have read rows from before the write.
+    """
+
+    def __init__(
+        self,
+        max_size: int = CACHE_MAX_SIZE,
+        ttl: float | None = CACHE_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be a positive integer")
+
+        self._max_size = max_size
+        self._ttl = ttl
+        self._clock = clock
+
+        self._entries: OrderedDict[Hashable, tuple[float | None, Any]] = OrderedDict()
+        # keys being loaded, with the number of running loaders and the number of invalidations since they started
+        self._loading: dict[Hashable, tuple[int, int]] = {}
+        self._lock = Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+
+            if entry is not _MISSING:
+                expires_at, value = entry
+
+                if expires_at is None or expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+
+                del self._entries[key]
+
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._store(key, value)
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            loaders, invalidations = self._loading.get(key, (0, 0))
+            self._loading[key] = (loaders + 1, invalidations)
+
+        loaded = False
+        try:
+            value = loader()
+            loaded = True
+        finally:
+            with self._lock:
+                loaders, current_invalidations = self._loading.pop(key)
+                if loaders > 1:
+                    self._loading[key] = (loaders - 1, current_invalidations)
+
+                if loaded and current_invalidations == invalidations:
+                    self._store(key, value)
+
+        return value
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drops every entry whose key matches the predicate, returns number of dropped entries"""
+        with self._lock:
+            keys = [key for key in self._entries if predicate(key)]
+
+            for key in keys:
+                del self._entries[key]
+
+            for key, (loaders, invalidations) in self._loading.items():
+                if predicate(key):
+                    self._loading[key] = (loaders, invalidations + 1)
+
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+            for key, (loaders, invalidations) in self._loading.items():
+                self._loading[key] = (loaders, invalidations + 1)
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        expires_at = None if self._ttl is None else self._clock() + self._ttl
+
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+
+
+def add_write_listener(listener: Callable[[int], None]) -> None:
+    """Registers a listener called with id of the engine whenever a repository of it writes"""
+    _write_listeners.append(listener)
+
+
+def notify_write(engine_id: int) -> None:
+    for listener in _write_listeners:
+        listener(engine_id)
@@ -15,8 +15,34 @@ PRODUCT_COLUMNS_SIZE = (25, 120, 50, 50, 130)
 ORDERS_COLUMNS = ("id", "qty", "customer_id", "product_id")
 ORDER_COLUMNS_SIZE = (25, 60, 60, 40, 200, 120)
 
+ORDER_VIEW_COLUMNS = (
+    "id",
+    "qty",
+    "customer_id",
+    "customer_name",
+    "customer_email",
+    "product_id",
+    "product_name",
+    "product_price",
+    "line_total",
+)
+ORDER_VIEW_COLUMNS_SIZE = (40, 50, 80, 140, 180, 70, 140, 90, 90)
+ORDERS_PAGE_SIZE = 100
+# rows loaded per page of customers and products lists, pages kept around the viewport and rows left
+# below (or above) it when the next page is requested
+TREE_PAGE_SIZE = 100
+TREE_MAX_PAGES = 5
+TREE_PREFETCH_ROWS = 20
+# an empty tree has nothing to scroll, so a failed first page is requested again after this delay
+TREE_RETRY_MS = 2000
+
 BACKGROUND = "azure3"
 FOREGROUND = "azure4"
 ERROR_COLOR = "red"
 
+WRITE_FAILURES_POLL_MS = 500
+
 EMAIL_REGEX = re.compile("[^@]+@[^@]+\.[^@]+")
+
+UI_WORKER_THREADS = 4
+BACKGROUND_POLL_MS = 50
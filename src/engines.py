@@ -1,15 +1,128 @@
-from sqlalchemy import create_engine, Engine
+import atexit
+import threading
+from typing import Any, Callable
 
-from src.config import MYSQL_URL, POSTGRES_URL, SQLITE_URL
+from sqlalchemy import create_engine, event, Engine
+from sqlalchemy.pool import StaticPool
 
+from src.config import (
+    MYSQL_URL,
+    POSTGRES_URL,
+    SQLITE_URL,
+    INSTRUMENTATION_ENABLED,
+    POOL_SIZE,
+    POOL_MAX_OVERFLOW,
+    POOL_RECYCLE_SECONDS,
+    POOL_PRE_PING,
+    SQLITE_PROFILE,
+)
+from src.instrumentation import instrument_engine
 
-def mysql_engine_factory() -> Engine:
-    return create_engine(MYSQL_URL)
 
+def mysql_engine_factory(url: str = MYSQL_URL) -> Engine:
+    return _instrumented(create_engine(url, **_pool_options()))
 
-def postgres_engine_factory() -> Engine:
-    return create_engine(POSTGRES_URL)
 
+def postgres_engine_factory(url: str = POSTGRES_URL) -> Engine:
+    return _instrumented(create_engine(url, **_pool_options()))
 
-def sqlite_engine_factory() -> Engine:
-    return create_engine(SQLITE_URL)
+
+# pragmas set on every new SQLite connection, WAL lets the UI read while a write is in progress
+SQLITE_PROFILES: dict[str, dict[str, Any]] = {
+    "interactive": {
+        "journal_mode": "WAL",
+        # with WAL commits survive crashes of the app, only a power loss can drop the last ones
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        # negative value is in KiB
+        "cache_size": -64 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+        "foreign_keys": "ON",
+    },
+    "bulk_load": {
+        "journal_mode": "WAL",
+        # database is loaded from a source that still exists, so it's fine to redo the load after a crash
+        "synchronous": "OFF",
+        "mmap_size": 1024 * 1024 * 1024,
+        "cache_size": -512 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 30000,
+        "foreign_keys": "ON",
+    },
+}
+
+
+def sqlite_engine_factory(url: str = SQLITE_URL, profile: str | None = SQLITE_PROFILE) -> Engine:
+    """SQLite engine with pragmas of the profile, None keeps SQLite defaults"""
+    engine = create_engine(url, **_pool_options())
+
+    if profile is not None:
+        apply_sqlite_profile(engine, SQLITE_PROFILES[profile])
+
+    return _instrumented(engine)
+
+
+def memory_engine_factory() -> Engine:
+    """Private in-memory SQLite database, lives as long as the engine and is shared by all its threads"""
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    apply_sqlite_profile(engine, {"foreign_keys": "ON"})
+
+    return _instrumented(engine)
+
+
+def apply_sqlite_profile(engine: Engine, pragmas: dict[str, Any]) -> None:
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+ENGINE_FACTORIES: dict[str, Callable[[], Engine]] = {
+    "mysql": mysql_engine_factory,
+    "postgres": postgres_engine_factory,
+    "sqlite": sqlite_engine_factory,
+}
+
+
+class EngineRegistry:
+    """Creates each engine on first use and shares it, with its connection pool, for the life of the process"""
+
+    def __init__(self, factories: dict[str, Callable[[], Engine]]) -> None:
+        self._factories = factories
+        self._engines: dict[str, Engine] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> Engine:
+        with self._lock:
+            if name not in self._engines:
+                self._engines[name] = self._factories[name]()
+
+            return self._engines[name]
+
+    def dispose(self) -> None:
+        """Closes pooled connections of all created engines, they are created again if used afterwards"""
+        with self._lock:
+            engines, self._engines = self._engines, {}
+
+        for engine in engines.values():
+            engine.dispose()
+
+
+engines = EngineRegistry(ENGINE_FACTORIES)
+atexit.register(engines.dispose)
+
+
+def _pool_options() -> dict[str, Any]:
+    return {
+        "pool_size": POOL_SIZE,
+        "max_overflow": POOL_MAX_OVERFLOW,
+        "pool_recycle": POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": POOL_PRE_PING,
+    }
+
+
+def _instrumented(engine: Engine) -> Engine:
+    return instrument_engine(engine) if INSTRUMENTATION_ENABLED else engine
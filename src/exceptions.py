@@ -8,3 +8,7 @@ class InvalidDataError(InfrastructureException):
 
 class RelationError(InfrastructureException):
     pass
+
+
+class RepeatedQueryError(Exception):
+    """Raised by repeated queries detection, not an infrastructure failure, so UI handlers don't swallow it"""
@@ -1,11 +1,11 @@
 from sqlalchemy import Engine, Table
 
 from src.repositories.abstract import IRepository
+from src.fuzzy import create_fuzzy_indexes
+from src.repeated_queries import watch_repeated_queries
+from src.search import create_search_indexes
 from src.tables import Base
-from src.repositories import ProductRepository, CustomerRepository, OrderRepository
-
-
-_PROJECT_REPOSITORIES = [ProductRepository, CustomerRepository, OrderRepository]
+from src.repositories import PROJECT_REPOSITORIES
 
 
 def recreate_tables(engine: Engine) -> None:
@@ -19,19 +19,34 @@ def recreate_tables(engine: Engine) -> None:
                 pass
 
     Base.metadata.create_all(engine)
+    create_search_indexes(engine)
+    create_fuzzy_indexes(engine)
+
 
+def export_data(from_engine: Engine, to_engine: Engine, incremental: bool = False) -> None:
+    """
+        Copies all records to `to_engine`, in batches.
 
-def export_data(from_engine: Engine, to_engine: Engine) -> None:
-    recreate_tables(to_engine)
+        By default destination tables are wiped before, `incremental` export keeps destination records
+        and upserts source ones over them.
+    """
+    if incremental:
+        Base.metadata.create_all(to_engine)
+        create_search_indexes(to_engine)
+        create_fuzzy_indexes(to_engine)
+    else:
+        recreate_tables(to_engine)
 
-    for repository in _PROJECT_REPOSITORIES:
+    for repository in PROJECT_REPOSITORIES:
         _export_repository(repository(from_engine), repository(to_engine))
 
 
+@watch_repeated_queries()
 def _export_repository(from_repo: IRepository, to_repo: IRepository) -> None:
     records = from_repo.get_all()
 
     for record in records:
         record.pop("_sa_instance_state")
 
-        to_repo.add(record)
+    # multi-row inserts into the wiped tables, rather than an add per record the repeated query detector warns of
+    to_repo.upsert_many(records)
@@ -0,0 +1,111 @@
+import argparse
+import csv
+import json
+from itertools import islice
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+from sqlalchemy import Engine, Table, insert
+from sqlalchemy.exc import IntegrityError, DataError
+
+from src.exceptions import InfrastructureException, InvalidDataError, RelationError
+from src.fuzzy import rebuild_trigram_index
+from src.stats import rebuild_stats
+from src.tables import Customer, Product, Order
+
+
+# in foreign key order, referenced tables are loaded first
+FIXTURE_TABLES: list[Table] = [Customer.__table__, Product.__table__, Order.__table__]
+
+_BATCH_SIZE = 10_000
+
+
+def load_fixtures(engine: Engine, directory: str | Path) -> dict[str, int]:
+    """
+        Loads `<table>.json` or `<table>.csv` files of the directory, returns number of loaded rows per table.
+
+        JSON file holds a list of objects, CSV file has a header with column names. Every table is loaded
+        in one transaction with bulk inserts, missing files are skipped. Order stats and customer trigrams
+        are rebuilt afterwards, since rows don't go through repositories.
+    """
+    directory = Path(directory)
+    loaded = {}
+
+    for table in FIXTURE_TABLES:
+        path = _fixture_path(directory, table)
+        if path is None:
+            continue
+
+        loaded[table.name] = load_rows(engine, table, _read_rows(path, table))
+
+    if loaded:
+        rebuild_stats(engine)
+        rebuild_trigram_index(engine)
+
+    return loaded
+
+
+def load_rows(engine: Engine, table: Table, rows: Iterable[dict[str, Any]]) -> int:
+    """Inserts rows in batches within one transaction, returns number of inserted rows"""
+    count = 0
+    rows = iter(rows)
+
+    try:
+        with engine.begin() as connection:
+            while batch := list(islice(rows, _BATCH_SIZE)):
+                connection.execute(insert(table), batch)
+                count += len(batch)
+    except IntegrityError:
+        raise RelationError(f"Impossible to load rows of {table.name}")
+    except DataError:
+        raise InvalidDataError("Invalid input")
+    except Exception as err:
+        raise InfrastructureException(f"Something went wrong with {err.__class__.__name__}: {str(err)}")
+
+    return count
+
+
+def _fixture_path(directory: Path, table: Table) -> Path | None:
+    for suffix in (".json", ".csv"):
+        path = directory / f"{table.name}{suffix}"
+        if path.exists():
+            return path
+
+    return None
+
+
+def _read_rows(path: Path, table: Table) -> Iterator[dict[str, Any]]:
+    if path.suffix == ".json":
+        with open(path, encoding="utf-8") as file:
+            yield from json.load(file)
+        return
+
+    with open(path, newline="", encoding="utf-8") as file:
+        for row in csv.DictReader(file):
+            yield {name: _parse_csv_value(table, name, value) for name, value in row.items()}
+
+
+def _parse_csv_value(table: Table, name: str, value: str) -> Any:
+    if value == "":
+        return None
+
+    python_type = table.columns[name].type.python_type
+    return python_type(value) if python_type in (int, float) else value
+
+
+if __name__ == "__main__":
+    from src.engines import ENGINE_FACTORIES
+    from src.export import recreate_tables
+
+    parser = argparse.ArgumentParser(description="Loads JSON or CSV fixtures of customers, products and orders")
+    parser.add_argument("engine", choices=sorted(ENGINE_FACTORIES))
+    parser.add_argument("directory")
+    parser.add_argument("--reset", action="store_true", help="wipe all tables before loading")
+    arguments = parser.parse_args()
+
+    engine = ENGINE_FACTORIES[arguments.engine]()
+    if arguments.reset:
+        recreate_tables(engine)
+
+    for table_name, count in load_fixtures(engine, arguments.directory).items():
+        print(f"{table_name}: {count} rows")
@@ -0,0 +1,217 @@
+import argparse
+import math
+import re
+from typing import Any
+
+from sqlalchemy import Engine, Select, delete, false, func, insert, select, text, union_all
+from sqlalchemy.orm import Session
+
+from src.config import FUZZY_MIN_SIMILARITY
+from src.exceptions import InfrastructureException
+from src.tables import Customer, CustomerTrigram
+
+
+_WORD_REGEX = re.compile(r"[^\W_]+", re.UNICODE)
+_FUZZY_COLUMNS = ("full_name", "email")
+# trigrams of more customers than this, like "com" of emails, are looked up only in part
+_FREQUENT_TRIGRAM_CUSTOMERS = 200
+_BATCH_SIZE = 1000
+
+
+def trigrams(value: str | None) -> set[str]:
+    """Trigrams of every word, padded the same way pg_trgm does, so both backends rank alike"""
+    result = set()
+
+    for word in _WORD_REGEX.findall((value or "").lower()):
+        padded = f"  {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+
+    return result
+
+
+def similarity(first: set[str], second: set[str]) -> float:
+    if not first or not second:
+        return 0.0
+
+    shared = len(first & second)
+    return shared / (len(first) + len(second) - shared)
+
+
+def create_fuzzy_indexes(engine: Engine) -> None:
+    """Creates pg_trgm indexes on Postgres, other dialects use the customer_trigram table created with the tables"""
+    if engine.dialect.name != "postgresql":
+        return
+
+    with engine.begin() as connection:
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+        for column in _FUZZY_COLUMNS:
+            connection.execute(
+                text(f"CREATE INDEX IF NOT EXISTS customer_{column}_trgm ON customer USING GIN ({column} gin_trgm_ops)")
+            )
+
+
+def remove_customers(session: Session, ids: list[int]) -> None:
+    """Drops trigrams of customers, call it before they are updated or deleted"""
+    if session.get_bind().dialect.name == "postgresql":
+        return
+
+    for start in range(0, len(ids), _BATCH_SIZE):
+        session.execute(delete(CustomerTrigram).where(CustomerTrigram.customer_id.in_(ids[start:start + _BATCH_SIZE])))
+
+
+def store_customers(session: Session, ids: list[int]) -> None:
+    """Indexes trigrams of customers, call it after they are added or updated"""
+    if session.get_bind().dialect.name == "postgresql":
+        return
+
+    for start in range(0, len(ids), _BATCH_SIZE):
+        query = select(Customer.id, Customer.full_name, Customer.email).where(
+            Customer.id.in_(ids[start:start + _BATCH_SIZE])
+        )
+        _insert_trigrams(session, session.execute(query))
+
+
+def rebuild_trigram_index(engine: Engine) -> None:
+    """Reindexes all customers in a single transaction"""
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as connection:
+            for column in _FUZZY_COLUMNS:
+                connection.execute(text(f"REINDEX INDEX customer_{column}_trgm"))
+        return
+
+    with Session(engine) as session:
+        try:
+            session.execute(delete(CustomerTrigram))
+
+            last_id = None
+            while True:
+                query = select(Customer.id, Customer.full_name, Customer.email).order_by(Customer.id).limit(_BATCH_SIZE)
+                if last_id is not None:
+                    query = query.where(Customer.id > last_id)
+
+                rows = session.execute(query).all()
+                if not rows:
+                    break
+
+                _insert_trigrams(session, rows)
+                last_id = rows[-1].id
+
+            session.commit()
+        except Exception as err:
+            raise InfrastructureException(f"Something went wrong with {err.__class__.__name__}: {str(err)}")
+
+
+def fuzzy_search(engine: Engine, query: str, limit: int) -> list[dict[str, Any]]:
+    """
+        Customers whose name or email is the most similar to the query, with `similarity` key from 0 to 1.
+
+        Customers less similar than FUZZY_MIN_SIMILARITY are not returned.
+    """
+    if engine.dialect.name == "postgresql":
+        return _pg_trgm_search(engine, query, limit)
+
+    query_trigrams = trigrams(query)
+    if not query_trigrams:
+        return []
+
+    with Session(engine) as session:
+        try:
+            frequencies = _trigram_frequencies(session, query_trigrams)
+            rows = [dict(row) for row in session.execute(_candidates_query(query_trigrams, frequencies)).mappings()]
+        except Exception as err:
+            raise InfrastructureException(f"Something went wrong with {err.__class__.__name__}: {str(err)}")
+
+    scored = []
+    for row in rows:
+        row["similarity"] = max(similarity(query_trigrams, trigrams(row[column])) for column in _FUZZY_COLUMNS)
+
+        if row["similarity"] >= FUZZY_MIN_SIMILARITY:
+            scored.append(row)
+
+    scored.sort(key=lambda row: (-row["similarity"], row["id"]))
+    return scored[:limit]
+
+
+def _trigram_frequencies(session: Session, query_trigrams: set[str]) -> dict[str, int]:
+    """Number of customers with each trigram, counted up to _FREQUENT_TRIGRAM_CUSTOMERS, so it's cheap for any"""
+    capped = [
+        select(CustomerTrigram.trigram)
+        .where(CustomerTrigram.trigram == trigram)
+        .limit(_FREQUENT_TRIGRAM_CUSTOMERS)
+        .subquery()
+        for trigram in sorted(query_trigrams)
+    ]
+    matches = union_all(*(select(subquery.c.trigram) for subquery in capped)).subquery()
+    frequencies = dict(session.execute(select(matches.c.trigram, func.count()).group_by(matches.c.trigram)).all())
+
+    return {trigram: frequencies.get(trigram, 0) for trigram in query_trigrams}
+
+
+def _candidates_query(query_trigrams: set[str], frequencies: dict[str, int]) -> Select:
+    """
+        Customers that may be similar enough to the query, looked up by its rarest trigrams.
+
+        Similarity of FUZZY_MIN_SIMILARITY needs at least `needed` query trigrams shared, so any such customer
+        has one of the `len(query_trigrams) - needed + 1` rarest ones. Only those are looked up, and at most
+        _FREQUENT_TRIGRAM_CUSTOMERS customers, of the lowest ids, are read per trigram. The lookup is exact
+        when these trigrams are all rarer than that, otherwise customers of frequent ones may be missed.
+    """
+    needed = max(1, math.ceil(FUZZY_MIN_SIMILARITY * len(query_trigrams)))
+    by_frequency = sorted(query_trigrams, key=lambda trigram: (frequencies[trigram], trigram))
+    rarest = by_frequency[:len(query_trigrams) - needed + 1]
+
+    capped = [
+        select(CustomerTrigram.customer_id)
+        .where(CustomerTrigram.trigram == trigram)
+        .order_by(CustomerTrigram.customer_id)
+        .limit(_FREQUENT_TRIGRAM_CUSTOMERS)
+        .subquery()
+        for trigram in rarest
+        if frequencies[trigram]
+    ]
+    customers = select(Customer.id, Customer.full_name, Customer.email)
+    if not capped:
+        return customers.where(false())
+
+    candidates = union_all(*(select(subquery.c.customer_id) for subquery in capped)).subquery()
+    return customers.where(Customer.id.in_(select(candidates.c.customer_id)))
+
+
+def _pg_trgm_search(engine: Engine, query: str, limit: int) -> list[dict[str, Any]]:
+    statement = text(
+        "SELECT id, full_name, email, GREATEST(similarity(full_name, :query), similarity(email, :query)) AS similarity "
+        "FROM customer WHERE (full_name % :query OR email % :query) "
+        "ORDER BY similarity DESC, id LIMIT :limit"
+    )
+
+    with engine.connect() as connection:
+        try:
+            connection.execute(text("SELECT set_limit(:threshold)"), {"threshold": FUZZY_MIN_SIMILARITY})
+            return [dict(row) for row in connection.execute(statement, {"query": query, "limit": limit}).mappings()]
+        except Exception as err:
+            raise InfrastructureException(f"Something went wrong with {err.__class__.__name__}: {str(err)}")
+
+
+def _insert_trigrams(session: Session, rows) -> None:
+    values = [
+        {"trigram": trigram, "customer_id": _id}
+        for _id, full_name, email in rows
+        for trigram in trigrams(full_name) | trigrams(email)
+    ]
+
+    if values:
+        # core insert of the table, ORM bulk insert bookkeeping costs more than the insert itself here
+        session.connection().execute(insert(CustomerTrigram.__table__), values)
+
+
+if __name__ == "__main__":
+    from src.engines import ENGINE_FACTORIES
+
+    parser = argparse.ArgumentParser(description="Creates and rebuilds customer trigram indexes")
+    parser.add_argument("engine", choices=sorted(ENGINE_FACTORIES))
+    arguments = parser.parse_args()
+
+    engine = ENGINE_FACTORIES[arguments.engine]()
+    create_fuzzy_indexes(engine)
+    rebuild_trigram_index(engine)
@@ -0,0 +1,223 @@
+import argparse
+import csv
+import itertools
+import os
+import random
+from collections import deque
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Any, Iterator
+
+from sqlalchemy import Engine, Table
+
+from src.fixtures import FIXTURE_TABLES, load_rows
+from src.fuzzy import rebuild_trigram_index
+from src.stats import rebuild_stats
+from src.tables import Customer, Product, Order
+
+
+_CHUNK_SIZE = 10_000
+# chunks generated ahead of the consumer per worker, the rest wait to be submitted until earlier ones are consumed
+_CHUNKS_AHEAD_PER_WORKER = 2
+# exponents of Zipf distributions, product popularity is steeper than customer activity
+_PRODUCT_SKEW = 1.1
+_CUSTOMER_SKEW = 0.8
+_QUANTITIES = (1, 2, 3, 4, 5)
+_QUANTITY_WEIGHTS = (50, 25, 12, 8, 5)
+
+_FIRST_NAMES = (
+    "Nick", "John", "Anna", "Maria", "Illia", "Vlad", "Olena", "Taras", "Sofia", "Andrii",
+    "Kateryna", "Petro", "Iryna", "Max", "Yulia", "Oleh", "Daria", "Roman", "Natalia", "Denys",
+)
+_LAST_NAMES = (
+    "Shevchenko", "Kovalenko", "Bondarenko", "Tkachenko", "Kravchenko", "Melnyk", "Boyko", "Koval",
+    "Oliinyk", "Lysenko", "Marchenko", "Savchenko", "Rudenko", "Moroz", "Pavlenko", "Petrenko",
+)
+_DOMAINS = ("dog.com", "mail.com", "shop.ua", "inbox.org", "post.net")
+_ADJECTIVES = ("Red", "Small", "Large", "Smart", "Classic", "Wooden", "Steel", "Soft", "Fast", "Green")
+_NOUNS = ("Ball", "Hog", "Chair", "Lamp", "Phone", "Kettle", "Bike", "Table", "Book", "Shoes", "Watch", "Bag")
+
+# cumulative Zipf weights, computed once per worker process
+_weights: dict[str, list[float]] = {}
+
+
+def generate(
+    customers: int,
+    products: int,
+    orders: int,
+    seed: int = 0,
+    workers: int | None = None,
+) -> Iterator[tuple[Table, Iterator[dict[str, Any]]]]:
+    """
+        Yields every table in foreign key order with a stream of its rows, generated by worker processes.
+
+        Rows are generated in chunks, each from its own random generator derived from the seed,
+        so the same arguments give the same rows whatever number of workers is used.
+        Every table stream must be consumed before the next one is taken.
+    """
+    if min(customers, products, orders) < 0:
+        raise ValueError("Numbers of rows can't be negative")
+    if orders and not (customers and products):
+        raise ValueError("Orders need at least one customer and one product")
+
+    sizes = {Customer.__table__: customers, Product.__table__: products, Order.__table__: orders}
+    chunks_ahead = (workers or os.cpu_count() or 1) * _CHUNKS_AHEAD_PER_WORKER
+
+    with Pool(workers, initializer=_initialize_worker, initargs=(customers, products)) as pool:
+        for table in FIXTURE_TABLES:
+            chunks = (
+                (table.name, seed, start, min(_CHUNK_SIZE, sizes[table] - start + 1))
+                for start in range(1, sizes[table] + 1, _CHUNK_SIZE)
+            )
+            yield table, itertools.chain.from_iterable(_generate_chunks(pool, chunks, chunks_ahead))
+
+
+def generate_into_engine(
+    engine: Engine,
+    customers: int,
+    products: int,
+    orders: int,
+    seed: int = 0,
+    workers: int | None = None,
+) -> dict[str, int]:
+    """Streams rows into empty tables of the engine, returns number of rows per table"""
+    loaded = {
+        table.name: load_rows(engine, table, rows)
+        for table, rows in generate(customers, products, orders, seed, workers)
+    }
+
+    rebuild_stats(engine)
+    rebuild_trigram_index(engine)
+
+    return loaded
+
+
+def generate_into_files(
+    directory: str | Path,
+    customers: int,
+    products: int,
+    orders: int,
+    seed: int = 0,
+    workers: int | None = None,
+) -> dict[str, int]:
+    """Writes `<table>.csv` files, which can be loaded with src.fixtures"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    written = {}
+
+    for table, rows in generate(customers, products, orders, seed, workers):
+        with open(directory / f"{table.name}.csv", "w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=[column.name for column in table.columns])
+            writer.writeheader()
+
+            written[table.name] = 0
+            for row in rows:
+                writer.writerow(row)
+                written[table.name] += 1
+
+    return written
+
+
+def _generate_chunks(pool: Pool, chunks: Iterator[tuple], chunks_ahead: int) -> Iterator[list[dict[str, Any]]]:
+    """
+        Generated chunks in order. Unlike `pool.imap`, submits a chunk only when fewer than `chunks_ahead` are
+        waiting to be consumed, so memory stays bounded however far the consumer falls behind.
+    """
+    pending = deque()
+
+    for chunk in chunks:
+        if len(pending) >= chunks_ahead:
+            yield pending.popleft().get()
+
+        pending.append(pool.apply_async(_generate_chunk, (chunk,)))
+
+    while pending:
+        yield pending.popleft().get()
+
+
+def _initialize_worker(customers: int, products: int) -> None:
+    _weights["customer"] = _zipf_cumulative_weights(customers, _CUSTOMER_SKEW)
+    _weights["product"] = _zipf_cumulative_weights(products, _PRODUCT_SKEW)
+
+
+def _zipf_cumulative_weights(size: int, skew: float) -> list[float]:
+    return list(itertools.accumulate(1 / rank ** skew for rank in range(1, size + 1)))
+
+
+def _generate_chunk(chunk: tuple[str, int, int, int]) -> list[dict[str, Any]]:
+    table_name, seed, start, count = chunk
+    randomizer = random.Random(f"{seed}:{table_name}:{start}")
+    ids = range(start, start + count)
+
+    if table_name == Customer.__tablename__:
+        return [_customer(randomizer, _id) for _id in ids]
+    if table_name == Product.__tablename__:
+        return [_product(randomizer, _id) for _id in ids]
+
+    customer_ids = _zipf_choices(randomizer, "customer", count)
+    product_ids = _zipf_choices(randomizer, "product", count)
+    quantities = randomizer.choices(_QUANTITIES, _QUANTITY_WEIGHTS, k=count)
+
+    return [
+        {"id": _id, "qty": qty, "customer_id": customer_id, "product_id": product_id}
+        for _id, qty, customer_id, product_id in zip(ids, quantities, customer_ids, product_ids)
+    ]
+
+
+def _zipf_choices(randomizer: random.Random, table_name: str, count: int) -> list[int]:
+    """Ids from 1, id 1 is the most popular one"""
+    weights = _weights[table_name]
+    return randomizer.choices(range(1, len(weights) + 1), cum_weights=weights, k=count)
+
+
+def _customer(randomizer: random.Random, _id: int) -> dict[str, Any]:
+    first_name = randomizer.choice(_FIRST_NAMES)
+    last_name = randomizer.choice(_LAST_NAMES)
+
+    return {
+        "id": _id,
+        "full_name": f"{first_name} {last_name}",
+        # id keeps emails unique
+        "email": f"{first_name.lower()}.{last_name.lower()}{_id}@{randomizer.choice(_DOMAINS)}",
+    }
+
+
+def _product(randomizer: random.Random, _id: int) -> dict[str, Any]:
+    name = f"{randomizer.choice(_ADJECTIVES)} {randomizer.choice(_NOUNS)}"
+
+    return {
+        "id": _id,
+        "name": name,
+        # long tail of prices, never below a cent, as price > 0 constraint requires
+        "price": max(0.01, round(randomizer.lognormvariate(3, 1), 2)),
+        "description": f"{name} number {_id}" if randomizer.random() < 0.8 else None,
+    }
+
+
+if __name__ == "__main__":
+    from src.engines import ENGINE_FACTORIES
+
+    parser = argparse.ArgumentParser(description="Generates reproducible synthetic customers, products and orders")
+    parser.add_argument("--customers", type=int, default=100_000)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="number of processes, all cores by default")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--engine", choices=sorted(ENGINE_FACTORIES), help="load into the engine, tables must be empty")
+    target.add_argument("--output", help="directory for CSV files")
+    arguments = parser.parse_args()
+
+    sizes = (arguments.customers, arguments.products, arguments.orders)
+    if min(sizes) < 0:
+        parser.error("numbers of rows can't be negative")
+    if arguments.orders and not (arguments.customers and arguments.products):
+        parser.error("--orders need at least one customer and one product")
+
+    if arguments.engine is not None:
+        counts = generate_into_engine(ENGINE_FACTORIES[arguments.engine](), *sizes, arguments.seed, arguments.workers)
+    else:
+        counts = generate_into_files(arguments.output, *sizes, arguments.seed, arguments.workers)
+
+    for table_name, count in counts.items():
+        print(f"{table_name}: {count} rows")
@@ -0,0 +1,253 @@
+import functools
+import json
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator
+
+from sqlalchemy import Engine, event
+
+from src.config import SLOW_QUERY_THRESHOLD_MS
+
+
+# upper bounds of latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float("inf"))
+
+slow_query_logger = logging.getLogger("src.instrumentation.slow_queries")
+
+_current_operation: ContextVar[str | None] = ContextVar("current_operation", default=None)
+# distinct for every call of an operation, tells statements of two calls apart
+_current_operation_call: ContextVar[object | None] = ContextVar("current_operation_call", default=None)
+
+_PLACEHOLDER = r"(?:\?|%s|%\(\w+\)s|:\w+)"
+_PLACEHOLDER_LIST_REGEX = re.compile(rf"\(\s*{_PLACEHOLDER}(?:\s*,\s*{_PLACEHOLDER})+\s*\)")
+_REPEATED_GROUPS_REGEX = re.compile(r"(\([^()]*\))(?:\s*,\s*\([^()]*\))+")
+_NUMBER_REGEX = re.compile(r"\b\d+(?:\.\d+)?\b")
+_STRING_REGEX = re.compile(r"'(?:[^']|'')*'")
+_WHITESPACE_REGEX = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Statement with literals, placeholder lists and multi-row VALUES collapsed, so repeats of a query look alike"""
+    statement = _STRING_REGEX.sub("?", statement)
+    statement = _NUMBER_REGEX.sub("?", statement)
+    statement = _PLACEHOLDER_LIST_REGEX.sub("(?, ...)", statement)
+    statement = _REPEATED_GROUPS_REGEX.sub(r"\1, ...", statement)
+    return _WHITESPACE_REGEX.sub(" ", statement).strip()
+
+
+class _Histogram:
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * len(LATENCY_BUCKETS_MS)
+
+    def add(self, duration_ms: float, failed: bool = False) -> None:
+        self.count += 1
+        self.errors += failed
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if duration_ms <= bound:
+                self.buckets[i] += 1
+                break
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "buckets": {
+                "inf" if bound == float("inf") else str(bound): count
+                for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets)
+            },
+        }
+
+
+class QueryStats:
+    """Thread safe collector of statement latencies, repository method calls and returned rows, failed ones included"""
+
+    def __init__(self, slow_query_threshold_ms: float = SLOW_QUERY_THRESHOLD_MS) -> None:
+        self.slow_query_threshold_ms = slow_query_threshold_ms
+
+        self._lock = threading.Lock()
+        self._statements: dict[str, _Histogram] = {}
+        self._statement_rows: dict[str, int] = {}
+        self._operations: dict[str, _Histogram] = {}
+        self._operation_queries: dict[str, int] = {}
+        self._operation_rows: dict[str, int] = {}
+
+    def record_statement(
+        self,
+        statement: str,
+        duration_ms: float,
+        rows: int,
+        parameters: Any = None,
+        failed: bool = False,
+    ) -> None:
+        key = fingerprint(statement)
+        operation = _current_operation.get()
+
+        with self._lock:
+            self._statements.setdefault(key, _Histogram()).add(duration_ms, failed)
+            self._statement_rows[key] = self._statement_rows.get(key, 0) + max(rows, 0)
+
+            if operation is not None:
+                self._operation_queries[operation] = self._operation_queries.get(operation, 0) + 1
+
+        if duration_ms >= self.slow_query_threshold_ms:
+            slow_query_logger.warning(
+                "slow query %.1f ms in %s: %s; parameters: %.200r",
+                duration_ms,
+                operation or "unknown operation",
+                key,
+                parameters,
+            )
+
+    def record_operation(self, operation: str, duration_ms: float, rows: int, failed: bool = False) -> None:
+        with self._lock:
+            self._operations.setdefault(operation, _Histogram()).add(duration_ms, failed)
+            self._operation_rows[operation] = self._operation_rows.get(operation, 0) + rows
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "statements": {
+                    key: {**histogram.to_dict(), "rows_affected": self._statement_rows.get(key, 0)}
+                    for key, histogram in self._statements.items()
+                },
+                "operations": {
+                    key: {
+                        **histogram.to_dict(),
+                        "queries": self._operation_queries.get(key, 0),
+                        "rows_returned": self._operation_rows.get(key, 0),
+                    }
+                    for key, histogram in self._operations.items()
+                },
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._statements.clear()
+            self._statement_rows.clear()
+            self._operations.clear()
+            self._operation_queries.clear()
+            self._operation_rows.clear()
+
+
+# process wide stats, engines created by src.engines report here when instrumentation is enabled
+query_stats = QueryStats()
+
+
+def instrument_engine(engine: Engine, stats: QueryStats = query_stats) -> Engine:
+    # start times of statements running on a connection, keyed by their execution context, since
+    # a failed statement never reaches after_cursor_execute and a failed fetch calls handle_error after it
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        conn.info.setdefault("query_start_times", {})[id(context)] = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        duration_ms = (time.perf_counter() - conn.info["query_start_times"].pop(id(context))) * 1000
+        stats.record_statement(statement, duration_ms, cursor.rowcount, parameters)
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context) -> None:
+        connection = exception_context.connection
+        if connection is None:
+            return
+
+        started_at = connection.info.get("query_start_times", {}).pop(id(exception_context.execution_context), None)
+        if started_at is not None:
+            duration_ms = (time.perf_counter() - started_at) * 1000
+            stats.record_statement(
+                exception_context.statement, duration_ms, 0, exception_context.parameters, failed=True
+            )
+
+    return engine
+
+
+@contextmanager
+def track_operation(name: str) -> Iterator[None]:
+    """Attributes statements executed inside to the named operation"""
+    token = _current_operation.set(name)
+    call_token = _current_operation_call.set(object())
+
+    try:
+        yield
+    finally:
+        _current_operation_call.reset(call_token)
+        _current_operation.reset(token)
+
+
+def current_operation() -> str | None:
+    return _current_operation.get()
+
+
+def current_operation_call() -> object | None:
+    return _current_operation_call.get()
+
+
+def instrumented(method: Callable) -> Callable:
+    """Records calls, latency and returned rows of a repository method, and tracks it as the current operation"""
+    @functools.wraps(method)
+    def _wrapper(self, *args, **kwargs):
+        operation = f"{type(self).__name__}.{method.__name__}"
+        started_at = time.perf_counter()
+        result = None
+        failed = True
+
+        try:
+            with track_operation(operation):
+                result = method(self, *args, **kwargs)
+
+            failed = False
+            return result
+        finally:
+            duration_ms = (time.perf_counter() - started_at) * 1000
+            query_stats.record_operation(operation, duration_ms, _returned_rows(result), failed)
+
+    return _wrapper
+
+
+def _returned_rows(result: Any) -> int:
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict):
+        # rows keyed by id, as get_many returns them, or a single row
+        return len(result) if all(isinstance(value, dict) for value in result.values()) else 1
+
+    return int(result is not None and not isinstance(result, bool))
+
+
+class StatsDumper(threading.Thread):
+    """Writes stats snapshot as JSON to the path every `interval` seconds, and once more when stopped"""
+
+    def __init__(self, path: str, interval: float, stats: QueryStats = query_stats) -> None:
+        super().__init__(name="query-stats-dumper", daemon=True)
+        self._path = path
+        self._interval = interval
+        self._stats = stats
+        self._stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self._stopped.wait(self._interval):
+            self.dump()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self.dump()
+
+    def dump(self) -> None:
+        snapshot = {"generated_at": time.time(), **self._stats.snapshot()}
+
+        with open(self._path, "w") as file:
+            json.dump(snapshot, file, indent=2)
@@ -0,0 +1,83 @@
+import argparse
+
+from sqlalchemy import Engine, Index, inspect, text
+from sqlalchemy.engine import Connection
+
+from src.exceptions import InfrastructureException
+from src.tables import Base
+
+
+def create_missing_indexes(engine: Engine) -> list[str]:
+    """
+        Builds indexes of `Base.metadata` missing in existing tables, returns names of built ones.
+
+        Writes to the tables are not blocked while an index is built: Postgres uses CREATE INDEX CONCURRENTLY
+        and MySQL online DDL. SQLite has no online DDL, index is built in a single short transaction.
+    """
+    created = []
+
+    # concurrent index build can't run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        inspector = inspect(connection)
+        existing_tables = set(inspector.get_table_names())
+
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+
+            for index in sorted(table.indexes, key=lambda index: index.name):
+                if index.name in existing_indexes and not _is_invalid(connection, index):
+                    continue
+
+                try:
+                    for statement in _create_index_statements(connection, index):
+                        connection.execute(text(statement))
+                except Exception as err:
+                    raise InfrastructureException(f"Something went wrong with {err.__class__.__name__}: {str(err)}")
+
+                created.append(index.name)
+
+    return created
+
+
+def _create_index_statements(connection: Connection, index: Index) -> list[str]:
+    preparer = connection.dialect.identifier_preparer
+    dialect_name = connection.dialect.name
+
+    name = preparer.quote(index.name)
+    table = preparer.quote(index.table.name)
+    columns = ", ".join(preparer.quote(column.name) for column in index.columns)
+
+    if dialect_name == "postgresql":
+        return [
+            # leftover of an interrupted concurrent build, it is not used by queries but still slows down writes
+            f"DROP INDEX CONCURRENTLY IF EXISTS {name}",
+            f"CREATE INDEX CONCURRENTLY {name} ON {table} ({columns})",
+        ]
+
+    if dialect_name == "mysql":
+        return [f"ALTER TABLE {table} ADD INDEX {name} ({columns}), ALGORITHM=INPLACE, LOCK=NONE"]
+
+    return [f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"]
+
+
+def _is_invalid(connection: Connection, index: Index) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+
+    query = text("SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)")
+    return bool(connection.scalar(query, {"name": index.name}))
+
+
+if __name__ == "__main__":
+    from src.engines import ENGINE_FACTORIES
+
+    parser = argparse.ArgumentParser(description="Builds missing indexes on existing tables without locking writes")
+    parser.add_argument("engine", choices=sorted(ENGINE_FACTORIES))
+    arguments = parser.parse_args()
+
+    engine = ENGINE_FACTORIES[arguments.engine]()
+    created = create_missing_indexes(engine)
+    print(f"Created indexes: {', '.join(created)}" if created else "All indexes already exist")
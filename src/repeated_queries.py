@@ -0,0 +1,168 @@
+import functools
+import threading
+import warnings
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, NamedTuple
+
+from sqlalchemy import Engine, event
+
+from src.config import REPEATED_QUERY_THRESHOLD, REPEATED_QUERY_DETECTION_ENABLED
+from src.exceptions import RepeatedQueryError
+from src.instrumentation import current_operation, current_operation_call, fingerprint
+
+
+# batched replacements of repository methods which are usually called per row
+_BATCHED_ALTERNATIVES = {
+    "get_one": "get_many(ids)",
+    "exists": "get_many(ids)",
+    "add": "upsert_many(records)",
+    "update": "upsert_many(records)",
+    "upsert": "upsert_many(records)",
+}
+# methods writing or reading in chunks, together with their write hooks, a call of them counts as one query
+_BATCHED_METHODS = {alternative.partition("(")[0] for alternative in _BATCHED_ALTERNATIVES.values()}
+
+_active_detector: ContextVar["RepeatedQueryDetector | None"] = ContextVar("active_repeated_query_detector", default=None)
+_listener_lock = threading.Lock()
+_listener_installed = False
+
+
+class RepeatedQueryWarning(UserWarning):
+    pass
+
+
+class RepeatedQuery(NamedTuple):
+    fingerprint: str
+    count: int
+    operation: str | None
+    suggestion: str | None
+
+    def describe(self) -> str:
+        description = f"{self.count} times: {self.fingerprint}"
+
+        if self.operation is not None:
+            description += f"\n    issued by {self.operation}"
+        if self.suggestion is not None:
+            description += f", consider {self.suggestion} instead"
+
+        return description
+
+
+class RepeatedQueryDetector:
+    """Counts statements by fingerprint, within one logical operation like a UI action or an export of a table"""
+
+    def __init__(self, name: str, threshold: int = REPEATED_QUERY_THRESHOLD) -> None:
+        self.name = name
+        self.threshold = threshold
+
+        self._counts: Counter[str] = Counter()
+        self._operations: dict[str, str | None] = {}
+        self._batched_calls: set[tuple[str, object]] = set()
+        self._lock = threading.Lock()
+
+    def record(self, statement: str) -> None:
+        key = fingerprint(statement)
+        operation = current_operation()
+
+        with self._lock:
+            if operation is not None and operation.rpartition(".")[2] in _BATCHED_METHODS:
+                # chunks of one batched call are not repeats, calls of it in a loop are
+                call = (key, current_operation_call())
+                if call in self._batched_calls:
+                    return
+                self._batched_calls.add(call)
+
+            self._counts[key] += 1
+            self._operations.setdefault(key, operation)
+
+    @property
+    def repeated(self) -> list[RepeatedQuery]:
+        with self._lock:
+            return [
+                RepeatedQuery(key, count, self._operations[key], _suggestion(self._operations[key]))
+                for key, count in self._counts.most_common()
+                if count > self.threshold
+            ]
+
+    def report(self) -> str:
+        details = "\n".join(f"  {query.describe()}" for query in self.repeated)
+        return f"{self.name} repeated queries more than {self.threshold} times:\n{details}"
+
+
+@contextmanager
+def detect_repeated_queries(
+    name: str,
+    threshold: int = REPEATED_QUERY_THRESHOLD,
+    fail: bool = False,
+) -> Iterator[RepeatedQueryDetector]:
+    """
+        Watches statements of all engines executed in the current context.
+
+        When a statement repeats more than `threshold` times, warns with RepeatedQueryWarning on exit,
+        or raises RepeatedQueryError if `fail` is set, which is meant for tests.
+    """
+    _install_listener()
+
+    detector = RepeatedQueryDetector(name, threshold)
+    token = _active_detector.set(detector)
+
+    try:
+        yield detector
+    finally:
+        _active_detector.reset(token)
+
+    if detector.repeated:
+        if fail:
+            raise RepeatedQueryError(detector.report())
+
+        warnings.warn(detector.report(), RepeatedQueryWarning, stacklevel=3)
+
+
+def watch_repeated_queries(name: str | None = None) -> Callable[[Callable], Callable]:
+    """Decorator wrapping each call in `detect_repeated_queries` when REPEATED_QUERY_DETECTION_ENABLED is set"""
+
+    def _decorator(function: Callable) -> Callable:
+        if not REPEATED_QUERY_DETECTION_ENABLED:
+            return function
+
+        @functools.wraps(function)
+        def _wrapper(*args, **kwargs):
+            with detect_repeated_queries(name or function.__qualname__):
+                return function(*args, **kwargs)
+
+        return _wrapper
+
+    return _decorator
+
+
+def _install_listener() -> None:
+    global _listener_installed
+
+    with _listener_lock:
+        if not _listener_installed:
+            # listening on the class covers every engine, including the ones created later
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+            _listener_installed = True
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    detector = _active_detector.get()
+
+    if detector is not None:
+        detector.record(statement)
+
+
+def _suggestion(operation: str | None) -> str | None:
+    if operation is None:
+        return None
+
+    repository, _, method = operation.rpartition(".")
+    alternative = _BATCHED_ALTERNATIVES.get(method)
+
+    # the batched method itself is called in a loop, nothing better to suggest
+    if alternative is None or alternative.partition("(")[0] == method:
+        return None
+
+    return f"{repository}.{alternative}"
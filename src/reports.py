@@ -0,0 +1,198 @@
+import weakref
+from typing import Any
+
+from sqlalchemy import Engine, Select, func, select, desc
+from sqlalchemy.engine import Connection
+
+from src.cache import LRUCache, add_write_listener
+from src.config import REPORTS_CACHE_SIZE, REPORTS_CACHE_TTL_SECONDS
+from src.exceptions import InfrastructureException
+from src.tables import Order, Product, Customer
+
+
+IdRange = tuple[int, int]
+
+# table name part of report cache keys, reports aggregate every table, so any write makes them stale
+REPORTS_CACHE_TABLE = "report"
+
+# shared by reports that aren't given a cache
+reports_cache = LRUCache(max_size=REPORTS_CACHE_SIZE, ttl=REPORTS_CACHE_TTL_SECONDS)
+# every cache reports were stored in, their entries of an engine are dropped on each write of its repositories
+_report_caches: weakref.WeakSet[LRUCache] = weakref.WeakSet([reports_cache])
+
+
+class OrderReports:
+    """
+        Aggregations over orders computed by the database.
+
+        Every report accepts optional inclusive id ranges of orders, customers and products to aggregate.
+        Results are cached until a repository of the same engine writes, for a short time at most.
+        Callers get copies of cached rows, so they may change them.
+    """
+
+    def __init__(self, engine: Engine, cache: LRUCache | None = None) -> None:
+        self._engine = engine
+        self._cache = reports_cache if cache is None else cache
+        _report_caches.add(self._cache)
+
+    def revenue_per_product(
+        self,
+        order_ids: IdRange | None = None,
+        customer_ids: IdRange | None = None,
+        product_ids: IdRange | None = None,
+    ) -> list[dict[str, Any]]:
+        """Products ordered at least once, with their order count, sold quantity, revenue and share of total revenue"""
+        revenue = func.sum(Order.qty * Product.price)
+        query = (
+            select(
+                Product.id.label("product_id"),
+                Product.name.label("product_name"),
+                func.count(Order.id).label("order_count"),
+                func.sum(Order.qty).label("total_qty"),
+                revenue.label("revenue"),
+            )
+            .join(Order, Order.product_id == Product.id)
+            .group_by(Product.id, Product.name)
+            .order_by(desc("revenue"), Product.id)
+        )
+        query = _filter(query, order_ids, customer_ids, product_ids)
+
+        return self._report("revenue_per_product", (order_ids, customer_ids, product_ids), query, "revenue")
+
+    def orders_per_customer(
+        self,
+        order_ids: IdRange | None = None,
+        customer_ids: IdRange | None = None,
+        product_ids: IdRange | None = None,
+    ) -> list[dict[str, Any]]:
+        """Customers with at least one order, with their order count, ordered quantity and spent amount"""
+        query = (
+            select(
+                Customer.id.label("customer_id"),
+                Customer.full_name.label("full_name"),
+                Customer.email.label("email"),
+                func.count(Order.id).label("order_count"),
+                func.sum(Order.qty).label("total_qty"),
+                func.sum(Order.qty * Product.price).label("revenue"),
+            )
+            .join(Order, Order.customer_id == Customer.id)
+            .join(Product, Order.product_id == Product.id)
+            .group_by(Customer.id, Customer.full_name, Customer.email)
+            .order_by(desc("order_count"), Customer.id)
+        )
+        query = _filter(query, order_ids, customer_ids, product_ids)
+
+        return self._report("orders_per_customer", (order_ids, customer_ids, product_ids), query, "order_count")
+
+    def top_customers(
+        self,
+        limit: int,
+        order_ids: IdRange | None = None,
+        customer_ids: IdRange | None = None,
+        product_ids: IdRange | None = None,
+    ) -> list[dict[str, Any]]:
+        """Customers ranked by spent amount, customers with equal amount share the rank, so more than `limit` may return"""
+        query = (
+            select(
+                Customer.id.label("customer_id"),
+                Customer.full_name.label("full_name"),
+                Customer.email.label("email"),
+                func.sum(Order.qty * Product.price).label("revenue"),
+            )
+            .join(Order, Order.customer_id == Customer.id)
+            .join(Product, Order.product_id == Product.id)
+            .group_by(Customer.id, Customer.full_name, Customer.email)
+            .order_by(desc("revenue"), Customer.id)
+        )
+        query = _filter(query, order_ids, customer_ids, product_ids)
+
+        args = (limit, order_ids, customer_ids, product_ids)
+        rows = self._cache.get_or_load(
+            self._cache_key("top_customers", args),
+            lambda: self._top(query, "revenue", limit),
+        )
+        return [dict(row) for row in rows]
+
+    def stats(self) -> dict[str, int]:
+        return self._cache.stats()
+
+    def _report(self, name: str, args: tuple, query: Select, rank_by: str) -> list[dict[str, Any]]:
+        rows = self._cache.get_or_load(self._cache_key(name, args), lambda: self._ranked(query, rank_by))
+        return [dict(row) for row in rows]
+
+    def _cache_key(self, name: str, args: tuple) -> tuple:
+        return id(self._engine), REPORTS_CACHE_TABLE, name, args
+
+    def _ranked(self, query: Select, rank_by: str) -> list[dict[str, Any]]:
+        with self._engine.connect() as connection:
+            try:
+                if not _supports_window_functions(connection):
+                    return _rank_rows([dict(row) for row in connection.execute(query).mappings()], rank_by)
+
+                return [dict(row) for row in connection.execute(_ranked_query(query, rank_by)).mappings()]
+            except Exception as err:
+                raise InfrastructureException(f"Something went wrong with {err.__class__.__name__}: {str(err)}")
+
+    def _top(self, query: Select, rank_by: str, limit: int) -> list[dict[str, Any]]:
+        with self._engine.connect() as connection:
+            try:
+                if not _supports_window_functions(connection):
+                    rows = _rank_rows([dict(row) for row in connection.execute(query).mappings()], rank_by)
+                    return [row for row in rows if row["rank"] <= limit]
+
+                ranked = _ranked_query(query, rank_by).subquery()
+                top = select(ranked).where(ranked.c.rank <= limit).order_by(ranked.c.rank, ranked.c[0])
+
+                return [dict(row) for row in connection.execute(top).mappings()]
+            except Exception as err:
+                raise InfrastructureException(f"Something went wrong with {err.__class__.__name__}: {str(err)}")
+
+
+def _drop_reports(engine_id: int) -> None:
+    for cache in list(_report_caches):
+        cache.invalidate(lambda key: isinstance(key, tuple) and key[:2] == (engine_id, REPORTS_CACHE_TABLE))
+
+
+add_write_listener(_drop_reports)
+
+
+def _ranked_query(query: Select, rank_by: str) -> Select:
+    """Adds RANK() by `rank_by` descending and share of its total to every row of the aggregated query"""
+    subquery = query.subquery()
+
+    return select(
+        subquery,
+        func.rank().over(order_by=subquery.c[rank_by].desc()).label("rank"),
+        (subquery.c[rank_by] * 1.0 / func.sum(subquery.c[rank_by]).over()).label("share"),
+    ).order_by(subquery.c[rank_by].desc(), subquery.c[0])
+
+
+def _filter(
+    query: Select,
+    order_ids: IdRange | None,
+    customer_ids: IdRange | None,
+    product_ids: IdRange | None,
+) -> Select:
+    for column, id_range in ((Order.id, order_ids), (Order.customer_id, customer_ids), (Order.product_id, product_ids)):
+        if id_range is not None:
+            query = query.where(column.between(*id_range))
+
+    return query
+
+
+def _supports_window_functions(connection: Connection) -> bool:
+    """MySQL got window functions only in 8.0, while docker-compose still runs 5.7"""
+    dialect = connection.dialect
+    return dialect.name != "mysql" or (dialect.server_version_info or (0,)) >= (8,)
+
+
+def _rank_rows(rows: list[dict[str, Any]], rank_by: str) -> list[dict[str, Any]]:
+    """Same as RANK() and share window columns, for rows already ordered by `rank_by` descending"""
+    total = sum(row[rank_by] or 0 for row in rows)
+
+    for position, row in enumerate(rows, start=1):
+        same_as_previous = position > 1 and rows[position - 2][rank_by] == row[rank_by]
+        row["rank"] = rows[position - 2]["rank"] if same_as_previous else position
+        row["share"] = row[rank_by] / total if total else None
+
+    return rows
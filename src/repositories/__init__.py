@@ -1,3 +1,7 @@
 from .customer import CustomerRepository
 from .product import ProductRepository
 from .order import OrderRepository
+
+
+# in order of foreign key dependencies
+PROJECT_REPOSITORIES = [ProductRepository, CustomerRepository, OrderRepository]
@@ -1,26 +1,50 @@
 from abc import ABC
-from typing import Any
+from typing import Any, Callable, Hashable, Iterable
 
-from sqlalchemy import Engine, update
+from sqlalchemy import Engine, Insert, exists, func, insert, select, text, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError, DataError
 
+from src.cache import LRUCache, notify_write
+from src.config import UPSERT_BATCH_SIZE
 from src.exceptions import InfrastructureException, InvalidDataError, RelationError
+from src.instrumentation import instrumented
 from src.tables import Base
 
 
+_GET_ONE = "get_one"
+# cached reads of a single id, these stay cached when other ids are written
+_POINT_LOOKUPS = (_GET_ONE, "exists")
+
+# maximum number of bound parameters a single statement may carry, per dialect
+_MAX_BIND_PARAMETERS = {"sqlite": 999, "postgresql": 32767, "mysql": 65535}
+_DEFAULT_MAX_BIND_PARAMETERS = 999
+_MAX_IDS_PER_QUERY = 5000
+
+
 class IRepository(ABC):
     _table_obj: Base
+    # tables, other than referencing ones, whose rows are changed by writes of this repository
+    _derived_tables: tuple[str, ...] = ()
 
-    def __init__(self, engine: Engine):
+    def __init__(self, engine: Engine, cache: LRUCache | None = None):
         self._engine = engine
+        self._cache = cache
+
+    @property
+    def engine(self) -> Engine:
+        return self._engine
 
+    @property
+    def table_name(self) -> str:
+        return self._table_obj.__tablename__
+
+    @instrumented
     def add(self, data: dict[str, Any]) -> None:
         with Session(self._engine) as session:
-            product_obj = self._table_obj(**data)
-
             try:
-                session.add(product_obj)
+                _id = self.apply_mutation(session, "add", data=data)
                 session.commit()
             except IntegrityError:
                 raise RelationError(f"Impossible to add this {self._table_obj.__name__}")
@@ -29,22 +53,24 @@ class IRepository(ABC):
             except Exception as err:
                 raise InfrastructureException(f"Something went wrong with {err.__class__.__name__}: {str(err)}")
 
+        self.invalidate_cache(_id)
+
+    @instrumented
     def delete(self, _id: int) -> None:
         with Session(self._engine) as session:
-            product_to_delete = session.query(self._table_obj).get(_id)
-
             try:
-                session.delete(product_to_delete)
+                self.apply_mutation(session, "delete", _id)
                 session.commit()
             except Exception as err:
                 raise InfrastructureException(f"Something went wrong with {err.__class__.__name__}: {str(err)}")
 
+        self.invalidate_cache(_id, cascade=True)
+
+    @instrumented
     def update(self, _id: int, data: dict[str, Any]):
         with Session(self._engine) as session:
             try:
-                session.execute(
-                    update(self._table_obj).where(self._table_obj.id == _id).values(**data)
-                )
+                self.apply_mutation(session, "update", _id, data)
                 session.commit()
             except IntegrityError:
                 raise RelationError(f"Impossible to add this {self._table_obj.__name__}")
@@ -53,16 +79,417 @@ class IRepository(ABC):
             except Exception as err:
                 raise InfrastructureException(f"Something went wrong with {err.__class__.__name__}: {str(err)}")
 
+        self.invalidate_cache(_id)
+
+    def apply_mutation(
+        self,
+        session: Session,
+        operation: str,
+        _id: int | None = None,
+        data: dict[str, Any] | None = None,
+    ) -> int:
+        """
+            Runs "add", "update" or "delete" in the passed session without committing it, returns id of the written row.
+
+            Lets several writes share one transaction, caller is responsible for `invalidate_cache` after the commit.
+        """
+        if operation == "add":
+            row = self._table_obj(**data)
+            session.add(row)
+            session.flush()
+            self._after_write(session, [row.id])
+            return row.id
+
+        if operation == "update":
+            columns = {column for column in data if column != "id" or data["id"] != _id}
+            self._before_write(session, [_id], columns)
+            session.execute(
+                update(self._table_obj).where(self._table_obj.id == _id).values(**data)
+            )
+            self._after_write(session, [data.get("id", _id)], columns)
+            return _id
+
+        if operation == "delete":
+            row_to_delete = session.get(self._table_obj, _id)
+            self._before_write(session, [_id])
+            session.delete(row_to_delete)
+            session.flush()
+            return _id
+
+        raise ValueError(f"Unknown operation {operation}")
+
+    def upsert(self, data: dict[str, Any]) -> None:
+        self.upsert_many([data])
+
+    @instrumented
+    def upsert_many(self, records: Iterable[dict[str, Any]]) -> None:
+        """
+            Inserts records, the ones whose id already exists are updated instead.
+
+            Records are written in a single transaction with one multi-row `INSERT ... ON CONFLICT DO UPDATE`
+            (`ON DUPLICATE KEY UPDATE` on MySQL) per batch, records with different set of keys go to different batches.
+            When several records share an id, the last one wins.
+            Records without id are inserted, ids generated for them are passed to the write hooks as well.
+        """
+        # postgres refuses to update the same row twice in one statement
+        records_by_id: dict[Hashable, dict[str, Any]] = {}
+        for position, record in enumerate(records):
+            if record.get("id") is None:
+                records_by_id[(None, position)] = {key: value for key, value in record.items() if key != "id"}
+            else:
+                records_by_id.pop(record["id"], None)
+                records_by_id[record["id"]] = record
+
+        if not records_by_id:
+            return
+
+        batches: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+        for record in records_by_id.values():
+            batches.setdefault(tuple(sorted(record)), []).append(record)
+
+        ids = [record["id"] for batch in batches.values() for record in batch if "id" in record]
+        # records are matched by id, so only the other columns can change
+        columns = {column for batch_columns in batches for column in batch_columns if column != "id"}
+
+        with Session(self._engine) as session:
+            try:
+                self._before_write(session, ids, columns)
+
+                for batch_columns, batch in batches.items():
+                    batch_size = self._upsert_batch_size(len(batch_columns))
+
+                    for start in range(0, len(batch), batch_size):
+                        chunk = batch[start:start + batch_size]
+                        if "id" in batch_columns:
+                            session.execute(self._upsert_statement(chunk, batch_columns))
+                        else:
+                            ids.extend(self._insert_returning_ids(session, chunk))
+
+                self._after_write(session, ids, columns)
+                session.commit()
+            except IntegrityError:
+                raise RelationError(f"Impossible to upsert this {self._table_obj.__name__}")
+            except DataError:
+                raise InvalidDataError("Invalid input")
+            except Exception as err:
+                raise InfrastructureException(f"Something went wrong with {err.__class__.__name__}: {str(err)}")
+
+        self.invalidate_cache(*ids)
+
+    def _insert_returning_ids(self, session: Session, records: list[dict[str, Any]]) -> list[int]:
+        """Inserts records without ids, returns ids the database generated for them"""
+        table = self._table_obj.__table__
+
+        if self._engine.dialect.insert_executemany_returning:
+            return list(session.scalars(insert(table).returning(table.c.id), records))
+
+        # MySQL can't return ids of several rows inserted at once
+        return [session.execute(insert(table).values(record)).inserted_primary_key[0] for record in records]
+
+    def _upsert_statement(self, records: list[dict[str, Any]], columns: tuple[str, ...]) -> Insert:
+        dialect_name = self._engine.dialect.name
+        update_columns = [column for column in columns if column != "id"]
+
+        if dialect_name == "mysql":
+            statement = mysql.insert(self._table_obj).values(records)
+            return statement.on_duplicate_key_update(
+                {column: statement.inserted[column] for column in update_columns or ["id"]}
+            )
+
+        if dialect_name in ("postgresql", "sqlite"):
+            insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+            statement = insert(self._table_obj).values(records)
+
+            if not update_columns:
+                return statement.on_conflict_do_nothing(index_elements=["id"])
+
+            return statement.on_conflict_do_update(
+                index_elements=["id"],
+                set_={column: statement.excluded[column] for column in update_columns},
+            )
+
+        raise InfrastructureException(f"Upsert is not supported for {dialect_name} dialect")
+
+    def _upsert_batch_size(self, columns_count: int) -> int:
+        limit = _MAX_BIND_PARAMETERS.get(self._engine.dialect.name, _DEFAULT_MAX_BIND_PARAMETERS)
+        return max(1, min(UPSERT_BATCH_SIZE, limit // columns_count))
+
+    @instrumented
     def get_all(self) -> list[dict[str, Any]]:
+        return [dict(row) for row in self._cached("get_all", (), self._get_all)]
+
+    @instrumented
+    def get_one(self, _id: int) -> dict[str, Any] | None:
+        row = self._cached(_GET_ONE, (int(_id),), lambda: self._get_one(_id))
+        return None if row is None else dict(row)
+
+    @instrumented
+    def exists(self, _id: int) -> bool:
+        if self._cache is not None:
+            row = self._cache.get(self._cache_key(_GET_ONE, (int(_id),)))
+
+            if row is not None:
+                return True
+
+        return self._cached("exists", (int(_id),), lambda: self._exists(_id))
+
+    @instrumented
+    def count(self, filters: dict[str, Any] | None = None, approximate: bool = False) -> int:
+        """
+            Counts rows whose columns equal passed filter values, a list or tuple value matches any of its items.
+
+            The `approximate` count of a whole table is read from the dialect catalog statistics,
+            which only are as fresh as the last ANALYZE. Exact count is used when the statistics are missing.
+        """
+        filters = {
+            column: tuple(value) if isinstance(value, (list, tuple, set)) else value
+            for column, value in (filters or {}).items()
+        }
+
+        unknown_columns = sorted(set(filters) - set(self._table_obj.__table__.c.keys()))
+        if unknown_columns:
+            raise InfrastructureException(f"{self._table_obj.__name__} has no {', '.join(unknown_columns)} column")
+
+        if approximate and not filters:
+            estimate = self._cached("count", ((), True), self._estimate_count)
+
+            if estimate is not None:
+                return estimate
+
+        return self._cached("count", (tuple(sorted(filters.items())), False), lambda: self._count(filters))
+
+    @instrumented
+    def get_many(self, ids: Iterable[int]) -> dict[int, dict[str, Any]]:
+        """
+            Fetches rows for all passed ids, ids that do not exist are missing from the result.
+
+            Ids are fetched with one `IN` query per chunk, chunk size respects the bind parameters limit
+            of the engine dialect. Rows already cached by `get_one` are not queried again.
+        """
+        result = {}
+        missing_ids = []
+
+        for _id in dict.fromkeys(int(_id) for _id in ids):
+            row = self._cache.get(self._cache_key(_GET_ONE, (_id,))) if self._cache is not None else None
+
+            if row is None:
+                missing_ids.append(_id)
+            else:
+                result[_id] = dict(row)
+
+        for _id, row in self._get_many(missing_ids).items():
+            if self._cache is not None:
+                self._cache.set(self._cache_key(_GET_ONE, (_id,)), row)
+
+            result[_id] = dict(row)
+
+        return result
+
+    @instrumented
+    def get_page(self, limit: int, after_id: int | None = None, before_id: int | None = None) -> list[dict[str, Any]]:
+        """
+            Returns up to `limit` rows ordered by id, starting after `after_id`, or the last ones before `before_id`.
+
+            Keyset pagination, unlike OFFSET a page costs the same wherever it is in the table.
+            Pages are not cached, a scrolled table would evict point lookups from the shared cache.
+        """
+        return self._get_page(limit, after_id, before_id)
+
+    def _exists(self, _id: int) -> bool:
+        with Session(self._engine) as session:
+            try:
+                return session.scalar(select(exists().where(self._table_obj.id == _id)))
+            except Exception as err:
+                raise InfrastructureException(f"Something went wrong with {err.__class__.__name__}: {str(err)}")
+
+    def _count(self, filters: dict[str, Any]) -> int:
+        query = select(func.count()).select_from(self._table_obj)
+
+        for column_name, value in filters.items():
+            column = self._table_obj.__table__.c[column_name]
+            query = query.where(column.in_(value) if isinstance(value, tuple) else column == value)
+
+        with Session(self._engine) as session:
+            try:
+                return session.scalar(query)
+            except Exception as err:
+                raise InfrastructureException(f"Something went wrong with {err.__class__.__name__}: {str(err)}")
+
+    def _estimate_count(self) -> int | None:
+        dialect_name = self._engine.dialect.name
+        table_name = self._table_obj.__tablename__
+
+        if dialect_name == "postgresql":
+            query = text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)")
+            table_name = self._engine.dialect.identifier_preparer.quote(table_name)
+        elif dialect_name == "mysql":
+            query = text(
+                "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :name"
+            )
+        elif dialect_name == "sqlite":
+            # row count is the first number of any stat row of the table
+            query = text("SELECT stat FROM sqlite_stat1 WHERE tbl = :name ORDER BY idx IS NOT NULL LIMIT 1")
+        else:
+            return None
+
+        with self._engine.connect() as connection:
+            try:
+                estimate = connection.scalar(query, {"name": table_name})
+            except Exception:  # statistics table may be missing until the first ANALYZE
+                return None
+
+        if estimate is None:
+            return None
+
+        estimate = int(str(estimate).split()[0])
+        # postgres reports -1 for tables which were never analyzed
+        return estimate if estimate >= 0 else None
+
+    def _get_many(self, ids: list[int]) -> dict[int, dict[str, Any]]:
+        chunk_size = self._max_ids_per_query()
+        rows = {}
+
+        # one session for all chunks, so its identity map is shared across them
+        with Session(self._engine) as session:
+            try:
+                for start in range(0, len(ids), chunk_size):
+                    chunk = ids[start:start + chunk_size]
+                    query = select(self._table_obj).where(self._table_obj.id.in_(chunk))
+
+                    for row in session.scalars(query):
+                        rows[row.id] = row.__dict__
+            except Exception as err:
+                raise InfrastructureException(f"Something went wrong with {err.__class__.__name__}: {str(err)}")
+
+        return rows
+
+    def _max_ids_per_query(self) -> int:
+        limit = _MAX_BIND_PARAMETERS.get(self._engine.dialect.name, _DEFAULT_MAX_BIND_PARAMETERS)
+        return min(limit, _MAX_IDS_PER_QUERY)
+
+    def _get_all(self) -> list[dict[str, Any]]:
         with Session(self._engine) as session:
             try:
                 return [row.__dict__ for row in session.query(self._table_obj).all()]
             except Exception as err:
                 raise InfrastructureException(f"Something went wrong with {err.__class__.__name__}: {str(err)}")
 
-    def get_one(self, _id: int) -> dict[str, Any]:
+    def _get_page(self, limit: int, after_id: int | None, before_id: int | None) -> list[dict[str, Any]]:
+        # plain rows, no ORM objects are built for rows that are only shown
+        # rows before `before_id` are read backwards from it and reversed
+        order = self._table_obj.id.desc() if before_id is not None else self._table_obj.id
+        query = select(*self._table_obj.__table__.c).order_by(order).limit(limit)
+        if after_id is not None:
+            query = query.where(self._table_obj.id > after_id)
+        if before_id is not None:
+            query = query.where(self._table_obj.id < before_id)
+
+        with Session(self._engine) as session:
+            try:
+                rows = [dict(row) for row in session.execute(query).mappings()]
+            except Exception as err:
+                raise InfrastructureException(f"Something went wrong with {err.__class__.__name__}: {str(err)}")
+
+        return rows[::-1] if before_id is not None else rows
+
+    def _get_one(self, _id: int) -> dict[str, Any] | None:
         with Session(self._engine) as session:
             try:
-                return session.query(self._table_obj).get(_id)
+                row = session.get(self._table_obj, _id)
             except Exception as err:
                 raise InfrastructureException(f"Something went wrong with {err.__class__.__name__}: {str(err)}")
+
+        return None if row is None else row.__dict__
+
+    def _before_write(self, session: Session, ids: list[int], columns: set[str] | None = None) -> None:
+        """
+            Called in the write transaction before rows with passed ids are updated or deleted.
+
+            `columns` are the ones an update writes, None when whole rows are deleted.
+        """
+
+    def _after_write(self, session: Session, ids: list[int], columns: set[str] | None = None) -> None:
+        """
+            Called in the write transaction after rows with passed ids are added or updated.
+
+            `columns` are the ones an update writes, None when whole rows are added.
+        """
+
+    def _get_stats(self, stats_table: Base, _id: int) -> dict[str, Any] | None:
+        def _load() -> dict[str, Any] | None:
+            with Session(self._engine) as session:
+                try:
+                    row = session.get(stats_table, _id)
+                except Exception as err:
+                    raise InfrastructureException(f"Something went wrong with {err.__class__.__name__}: {str(err)}")
+
+            return None if row is None else row.__dict__
+
+        if self._cache is None:
+            row = _load()
+        else:
+            row = self._cache.get_or_load(self._cache_key(_GET_ONE, (int(_id),), stats_table.__tablename__), _load)
+
+        return None if row is None else dict(row)
+
+    def _cached(self, method: str, args: tuple[Hashable, ...], loader: Callable[[], Any]) -> Any:
+        if self._cache is None:
+            return loader()
+
+        return self._cache.get_or_load(self._cache_key(method, args), loader)
+
+    def _cache_key(
+        self,
+        method: str,
+        args: tuple[Hashable, ...],
+        table_name: str | None = None,
+    ) -> tuple[int, str, str, tuple[Hashable, ...]]:
+        # repositories of different engines may share the cache, equal table and args don't mean equal rows
+        return id(self._engine), table_name or self._table_obj.__tablename__, method, args
+
+    def invalidate_cache(self, *ids: int, cascade: bool = False) -> None:
+        """
+            Drops cached reads that the write of `ids` may have changed, all point lookups if no ids passed.
+
+            Only entries of the repository engine are dropped. Point lookups of other ids stay cached.
+            Collection queries of this table are dropped, as well as the ones of the tables referencing it,
+            because they may join this table.
+            When `cascade` is set, all entries of the referencing tables are dropped, since their rows
+            could have been removed by ON DELETE CASCADE. Write listeners are notified as well,
+            so results aggregating every table, like reports, are dropped wherever they are cached.
+        """
+        table_name = self._table_obj.__tablename__
+        written_keys = {(int(_id),) for _id in ids}
+        dependent_tables = _referencing_tables(table_name)
+
+        def _is_stale(key: Hashable) -> bool:
+            if not isinstance(key, tuple) or len(key) != 4:
+                return False
+
+            key_engine, key_table, method, args = key
+
+            if key_engine != id(self._engine):
+                return False
+
+            if key_table == table_name:
+                return method not in _POINT_LOOKUPS or not written_keys or args in written_keys
+            if key_table in dependent_tables:
+                return cascade or method not in _POINT_LOOKUPS
+            if key_table in self._derived_tables:
+                return True
+
+            return False
+
+        if self._cache is not None:
+            self._cache.invalidate(_is_stale)
+
+        notify_write(id(self._engine))
+
+
+def _referencing_tables(table_name: str) -> set[str]:
+    return {
+        table.name
+        for table in Base.metadata.sorted_tables
+        for foreign_key in table.foreign_keys
+        if foreign_key.column.table.name == table_name
+    }
@@ -1,6 +1,42 @@
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+from src.fuzzy import fuzzy_search, remove_customers, store_customers
+from src.instrumentation import instrumented
 from src.repositories.abstract import IRepository
-from src.tables import Customer
+from src.search import search
+from src.stats import STATS_TABLES, affects_stats, remove_orders, store_orders
+from src.tables import Customer, Order, CustomerOrderStats
 
 
 class CustomerRepository(IRepository):
     _table_obj = Customer
+    _derived_tables = STATS_TABLES
+
+    @instrumented
+    def get_stats(self, _id: int) -> dict[str, Any] | None:
+        """Order count, ordered quantity and revenue of the customer, read from the maintained stats table"""
+        return self._get_stats(CustomerOrderStats, _id)
+
+    @instrumented
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> list[dict[str, Any]]:
+        """Page of customers matching all words of the query, best matching first, see `src.search.search`"""
+        rows = self._cached("search", (query, limit, offset), lambda: search(self._engine, Customer, query, limit, offset))
+        return [dict(row) for row in rows]
+
+    @instrumented
+    def fuzzy_search(self, query: str, limit: int = 10) -> list[dict[str, Any]]:
+        """Customers with name or email most similar to the query, tolerates misspelling, see `src.fuzzy.fuzzy_search`"""
+        rows = self._cached("fuzzy_search", (query, limit), lambda: fuzzy_search(self._engine, query, limit))
+        return [dict(row) for row in rows]
+
+    def _before_write(self, session: Session, ids: list[int], columns: set[str] | None = None) -> None:
+        if affects_stats(Customer, columns):
+            remove_orders(session, Order.customer_id, ids)
+        remove_customers(session, ids)
+
+    def _after_write(self, session: Session, ids: list[int], columns: set[str] | None = None) -> None:
+        if affects_stats(Customer, columns):
+            store_orders(session, Order.customer_id, ids)
+        store_customers(session, ids)
@@ -1,6 +1,86 @@
+from typing import Any
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from src.exceptions import InfrastructureException
+from src.instrumentation import instrumented
 from src.repositories.abstract import IRepository
-from src.tables import Order
+from src.stats import STATS_TABLES, affects_stats, remove_orders, store_orders
+from src.tables import Order, Customer, Product
 
 
 class OrderRepository(IRepository):
     _table_obj = Order
+    _derived_tables = STATS_TABLES
+
+    @instrumented
+    def get_order_views(
+        self,
+        limit: int,
+        offset: int = 0,
+        after_id: int | None = None,
+        before_id: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+            Returns page of orders joined with their customer and product, ordered by order id,
+            starting after `after_id`, or the last ones before `before_id`.
+
+            Keyset pages are not cached, a scrolled table would evict point lookups from the shared cache.
+        """
+        if after_id is not None or before_id is not None:
+            return self._get_order_views(limit, offset, after_id, before_id)
+
+        rows = self._cached(
+            "get_order_views",
+            (limit, offset, after_id),
+            lambda: self._get_order_views(limit, offset, after_id, None),
+        )
+        return [dict(row) for row in rows]
+
+    def _before_write(self, session: Session, ids: list[int], columns: set[str] | None = None) -> None:
+        if affects_stats(Order, columns):
+            remove_orders(session, Order.id, ids)
+
+    def _after_write(self, session: Session, ids: list[int], columns: set[str] | None = None) -> None:
+        if affects_stats(Order, columns):
+            store_orders(session, Order.id, ids)
+
+    def _get_order_views(
+        self,
+        limit: int,
+        offset: int,
+        after_id: int | None,
+        before_id: int | None,
+    ) -> list[dict[str, Any]]:
+        query = (
+            select(
+                Order.id,
+                Order.qty,
+                Order.customer_id,
+                Customer.full_name.label("customer_name"),
+                Customer.email.label("customer_email"),
+                Order.product_id,
+                Product.name.label("product_name"),
+                Product.price.label("product_price"),
+                (Order.qty * Product.price).label("line_total"),
+            )
+            .outerjoin(Customer, Order.customer_id == Customer.id)
+            .outerjoin(Product, Order.product_id == Product.id)
+            # rows before `before_id` are read backwards from it and reversed
+            .order_by(Order.id.desc() if before_id is not None else Order.id)
+            .limit(limit)
+            .offset(offset)
+        )
+        if after_id is not None:
+            query = query.where(Order.id > after_id)
+        if before_id is not None:
+            query = query.where(Order.id < before_id)
+
+        with Session(self._engine) as session:
+            try:
+                rows = [dict(row) for row in session.execute(query).mappings()]
+            except Exception as err:
+                raise InfrastructureException(f"Something went wrong with {err.__class__.__name__}: {str(err)}")
+
+        return rows[::-1] if before_id is not None else rows
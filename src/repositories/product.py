@@ -1,6 +1,33 @@
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+from src.instrumentation import instrumented
 from src.repositories.abstract import IRepository
-from src.tables import Product
+from src.search import search
+from src.stats import STATS_TABLES, affects_stats, remove_orders, store_orders
+from src.tables import Product, Order, ProductSalesStats
 
 
 class ProductRepository(IRepository):
     _table_obj = Product
+    _derived_tables = STATS_TABLES
+
+    @instrumented
+    def get_stats(self, _id: int) -> dict[str, Any] | None:
+        """Order count, ordered quantity and revenue of the product, read from the maintained stats table"""
+        return self._get_stats(ProductSalesStats, _id)
+
+    @instrumented
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> list[dict[str, Any]]:
+        """Page of products matching all words of the query, best matching first, see `src.search.search`"""
+        rows = self._cached("search", (query, limit, offset), lambda: search(self._engine, Product, query, limit, offset))
+        return [dict(row) for row in rows]
+
+    def _before_write(self, session: Session, ids: list[int], columns: set[str] | None = None) -> None:
+        if affects_stats(Product, columns):
+            remove_orders(session, Order.product_id, ids)
+
+    def _after_write(self, session: Session, ids: list[int], columns: set[str] | None = None) -> None:
+        if affects_stats(Product, columns):
+            store_orders(session, Order.product_id, ids)
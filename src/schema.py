@@ -0,0 +1,102 @@
+import argparse
+import hashlib
+
+import sqlalchemy as sq
+from sqlalchemy import Engine, delete, insert, select
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from src.exceptions import InfrastructureException
+from src.fuzzy import create_fuzzy_indexes, rebuild_trigram_index
+from src.migrations import create_missing_indexes
+from src.search import SEARCH_COLUMNS, create_search_indexes, rebuild_search_indexes, search_index_names
+from src.stats import STATS_TABLES, rebuild_stats
+from src.tables import Base, CustomerTrigram
+
+
+# kept apart from Base.metadata, so recreating and exporting tables doesn't touch it
+_schema_metadata = sq.MetaData()
+
+_schema_version_table = sq.Table(
+    "schema_version",
+    _schema_metadata,
+    sq.Column("fingerprint", sq.String(64), primary_key=True),
+)
+
+
+def schema_fingerprint(engine: Engine) -> str:
+    """Hash of DDL of all tables, their indexes and full text index columns, as rendered for the engine dialect"""
+    statements = []
+
+    for table in Base.metadata.sorted_tables:
+        statements.append(str(CreateTable(table).compile(dialect=engine.dialect)))
+        statements.extend(
+            str(CreateIndex(index).compile(dialect=engine.dialect))
+            for index in sorted(table.indexes, key=lambda index: index.name)
+        )
+
+    statements.append(repr(sorted(SEARCH_COLUMNS.items())))
+    return hashlib.sha256("\n".join(statements).encode()).hexdigest()
+
+
+def ensure_schema(engine: Engine) -> bool:
+    """
+        Creates missing tables and indexes unless the database was already set up for the current schema.
+
+        Takes a single query when fingerprints match. Returns whether the schema was updated.
+        Existing tables are not altered, changed columns still need a migration. Tables derived from
+        existing rows, like stats, are filled when created, before the new fingerprint is stored.
+    """
+    fingerprint = schema_fingerprint(engine)
+
+    if _stored_fingerprint(engine) == fingerprint:
+        return False
+
+    try:
+        existing_tables = set(sq.inspect(engine).get_table_names())
+
+        Base.metadata.create_all(engine)
+        create_missing_indexes(engine)
+        create_search_indexes(engine)
+        create_fuzzy_indexes(engine)
+        _schema_metadata.create_all(engine)
+
+        _fill_created_tables(engine, set(sq.inspect(engine).get_table_names()) - existing_tables)
+
+        with engine.begin() as connection:
+            connection.execute(delete(_schema_version_table))
+            connection.execute(insert(_schema_version_table).values(fingerprint=fingerprint))
+    except InfrastructureException:
+        raise
+    except Exception as err:
+        raise InfrastructureException(f"Something went wrong with {err.__class__.__name__}: {str(err)}")
+
+    return True
+
+
+def _fill_created_tables(engine: Engine, created_tables: set[str]) -> None:
+    if created_tables.intersection(STATS_TABLES):
+        rebuild_stats(engine)
+    if CustomerTrigram.__tablename__ in created_tables:
+        rebuild_trigram_index(engine)
+    # only SQLite full text indexes are tables, others are filled by the database once created
+    if created_tables.intersection(search_index_names()):
+        rebuild_search_indexes(engine)
+
+
+def _stored_fingerprint(engine: Engine) -> str | None:
+    with engine.connect() as connection:
+        try:
+            return connection.scalar(select(_schema_version_table.c.fingerprint))
+        except Exception:  # table doesn't exist yet, error differs from one driver to another
+            return None
+
+
+if __name__ == "__main__":
+    from src.engines import ENGINE_FACTORIES
+
+    parser = argparse.ArgumentParser(description="Creates missing tables and indexes if the schema has changed")
+    parser.add_argument("engine", choices=sorted(ENGINE_FACTORIES))
+    arguments = parser.parse_args()
+
+    updated = ensure_schema(ENGINE_FACTORIES[arguments.engine]())
+    print("Schema updated" if updated else "Schema is up to date")
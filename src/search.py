@@ -0,0 +1,157 @@
+import argparse
+import re
+from typing import Any
+
+from sqlalchemy import Engine, text
+from sqlalchemy.engine import Connection
+
+from src.exceptions import InfrastructureException
+from src.tables import Base, Customer, Product
+
+
+# columns of each searchable table covered by its full text index
+SEARCH_COLUMNS = {
+    Product.__tablename__: ("name", "description"),
+    Customer.__tablename__: ("full_name", "email"),
+}
+
+_WORD_REGEX = re.compile(r"\w+", re.UNICODE)
+
+
+def create_search_indexes(engine: Engine) -> None:
+    """Creates full text indexes of searchable tables, tables themselves must already exist"""
+    with engine.begin() as connection:
+        for table_name, columns in SEARCH_COLUMNS.items():
+            for statement in _create_index_statements(connection, table_name, columns):
+                connection.execute(text(statement))
+
+
+def rebuild_search_indexes(engine: Engine) -> None:
+    """Rebuilds full text indexes from table contents, e.g. after rows were written with triggers disabled"""
+    with engine.begin() as connection:
+        for table_name in SEARCH_COLUMNS:
+            dialect_name = connection.dialect.name
+            index_name = _index_name(table_name)
+
+            if dialect_name == "sqlite":
+                connection.execute(text(f"INSERT INTO {index_name}({index_name}) VALUES ('rebuild')"))
+            elif dialect_name == "postgresql":
+                connection.execute(text(f"REINDEX INDEX {index_name}"))
+            elif dialect_name == "mysql":
+                connection.execute(text(f"OPTIMIZE TABLE `{table_name}`"))
+
+
+def search_index_names() -> list[str]:
+    """Names of full text indexes, SQLite ones are virtual tables"""
+    return [_index_name(table_name) for table_name in SEARCH_COLUMNS]
+
+
+def search(engine: Engine, table: Base, query: str, limit: int, offset: int = 0) -> list[dict[str, Any]]:
+    """
+        Returns rows matching all words of the query, best matching first.
+
+        Every row has additional `score` key, bigger is better, though values are not comparable between dialects.
+    """
+    table_name = table.__tablename__
+    columns = SEARCH_COLUMNS[table_name]
+    words = _WORD_REGEX.findall(query)
+
+    if not words:
+        return []
+
+    dialect_name = engine.dialect.name
+    parameters = {"limit": limit, "offset": offset}
+
+    if dialect_name == "sqlite":
+        index_name = _index_name(table_name)
+        # every word is quoted, so user input can't break fts5 query syntax, and matched as prefix
+        parameters["query"] = " ".join(f'"{word}"*' for word in words)
+        statement = (
+            f'SELECT t.*, -bm25({index_name}) AS score FROM {index_name} JOIN "{table_name}" t ON t.id = {index_name}.rowid '
+            f"WHERE {index_name} MATCH :query ORDER BY bm25({index_name}), t.id LIMIT :limit OFFSET :offset"
+        )
+    elif dialect_name == "postgresql":
+        parameters["query"] = " ".join(words)
+        document = _postgres_document(columns)
+        statement = (
+            f'SELECT t.*, ts_rank({document}, plainto_tsquery(\'simple\', :query)) AS score FROM "{table_name}" t '
+            f"WHERE {document} @@ plainto_tsquery('simple', :query) ORDER BY score DESC, t.id LIMIT :limit OFFSET :offset"
+        )
+    elif dialect_name == "mysql":
+        parameters["query"] = " ".join(f"+{word}*" for word in words)
+        match = f"MATCH({', '.join(columns)}) AGAINST (:query IN BOOLEAN MODE)"
+        statement = (
+            f"SELECT t.*, {match} AS score FROM `{table_name}` t "
+            f"WHERE {match} ORDER BY score DESC, t.id LIMIT :limit OFFSET :offset"
+        )
+    else:
+        raise InfrastructureException(f"Full text search is not supported for {dialect_name} dialect")
+
+    with engine.connect() as connection:
+        try:
+            return [dict(row) for row in connection.execute(text(statement), parameters).mappings()]
+        except Exception as err:
+            raise InfrastructureException(f"Something went wrong with {err.__class__.__name__}: {str(err)}")
+
+
+def _create_index_statements(connection: Connection, table_name: str, columns: tuple[str, ...]) -> list[str]:
+    dialect_name = connection.dialect.name
+    index_name = _index_name(table_name)
+
+    if dialect_name == "sqlite":
+        # external content table, kept in sync with the table by triggers
+        new_values = ", ".join(f"new.{column}" for column in columns)
+        old_values = ", ".join(f"old.{column}" for column in columns)
+        column_names = ", ".join(columns)
+        delete_row = (
+            f"INSERT INTO {index_name}({index_name}, rowid, {column_names}) VALUES ('delete', old.id, {old_values});"
+        )
+        insert_row = f"INSERT INTO {index_name}(rowid, {column_names}) VALUES (new.id, {new_values});"
+
+        return [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {index_name} "
+            f"USING fts5({column_names}, content='{table_name}', content_rowid='id')",
+            f'CREATE TRIGGER IF NOT EXISTS {index_name}_ai AFTER INSERT ON "{table_name}" BEGIN {insert_row} END',
+            f'CREATE TRIGGER IF NOT EXISTS {index_name}_ad AFTER DELETE ON "{table_name}" BEGIN {delete_row} END',
+            f'CREATE TRIGGER IF NOT EXISTS {index_name}_au AFTER UPDATE ON "{table_name}" BEGIN {delete_row} {insert_row} END',
+        ]
+
+    if dialect_name == "postgresql":
+        return [f'CREATE INDEX IF NOT EXISTS {index_name} ON "{table_name}" USING GIN ({_postgres_document(columns)})']
+
+    if dialect_name == "mysql":
+        index_exists = connection.execute(
+            text(
+                "SELECT 1 FROM information_schema.STATISTICS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND INDEX_NAME = :index"
+            ),
+            {"table": table_name, "index": index_name},
+        ).first()
+
+        if index_exists:
+            return []
+
+        return [f"ALTER TABLE `{table_name}` ADD FULLTEXT INDEX {index_name} ({', '.join(columns)})"]
+
+    return []
+
+
+def _index_name(table_name: str) -> str:
+    return f"{table_name}_fts"
+
+
+def _postgres_document(columns: tuple[str, ...]) -> str:
+    concatenated = " || ' ' || ".join(f"coalesce({column}, '')" for column in columns)
+    return f"to_tsvector('simple', {concatenated})"
+
+
+if __name__ == "__main__":
+    from src.engines import ENGINE_FACTORIES
+
+    parser = argparse.ArgumentParser(description="Creates missing full text indexes and rebuilds them")
+    parser.add_argument("engine", choices=sorted(ENGINE_FACTORIES))
+    arguments = parser.parse_args()
+
+    engine = ENGINE_FACTORIES[arguments.engine]()
+    create_search_indexes(engine)
+    rebuild_search_indexes(engine)
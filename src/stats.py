@@ -0,0 +1,141 @@
+import argparse
+from collections import defaultdict
+from typing import Iterable
+
+from sqlalchemy import Engine, Column, Insert, delete, func, insert, select
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from src.exceptions import InfrastructureException
+from src.tables import Base, Customer, Order, Product, CustomerOrderStats, ProductSalesStats
+
+
+STATS_TABLES = (CustomerOrderStats.__tablename__, ProductSalesStats.__tablename__)
+
+# columns of each table stats depend on, writes of other columns leave stats as they are
+_STATS_COLUMNS = {
+    Order.__tablename__: {"id", "qty", "customer_id", "product_id"},
+    Customer.__tablename__: {"id"},
+    Product.__tablename__: {"id", "price"},
+}
+
+_IDS_PER_QUERY = 500
+# stats rows per upsert statement, 4 bound parameters each fit SQLite limit of 999
+_ROWS_PER_UPSERT = 200
+
+
+def affects_stats(table: Base, columns: set[str] | None) -> bool:
+    """Whether writing `columns` of the table rows changes stats, None stands for whole rows added or deleted"""
+    return columns is None or not _STATS_COLUMNS[table.__tablename__].isdisjoint(columns)
+
+
+def remove_orders(session: Session, column: Column, ids: list[int]) -> None:
+    """Subtracts orders whose `column` is in ids from stats, call it before these orders or their relations change"""
+    _apply(session, _contributions(session, column, ids), sign=-1)
+
+
+def store_orders(session: Session, column: Column, ids: list[int]) -> None:
+    """Adds orders whose `column` is in ids to stats, call it after these orders or their relations changed"""
+    _apply(session, _contributions(session, column, ids), sign=1)
+
+
+def rebuild_stats(engine: Engine) -> None:
+    """Recomputes all stats from scratch in a single transaction"""
+    revenue = func.sum(Order.qty * Product.price)
+    totals = (func.count(Order.id), func.coalesce(func.sum(Order.qty), 0), func.coalesce(revenue, 0))
+
+    with Session(engine) as session:
+        try:
+            for stats_table, column in ((CustomerOrderStats, Order.customer_id), (ProductSalesStats, Order.product_id)):
+                session.execute(delete(stats_table))
+                session.execute(
+                    insert(stats_table).from_select(
+                        ["id", "order_count", "total_qty", "revenue"],
+                        select(column, *totals)
+                        .join(Product, Order.product_id == Product.id)
+                        .where(column.is_not(None))
+                        .group_by(column),
+                    )
+                )
+
+            session.commit()
+        except Exception as err:
+            raise InfrastructureException(f"Something went wrong with {err.__class__.__name__}: {str(err)}")
+
+
+def _contributions(session: Session, column: Column, ids: list[int]) -> list[tuple[int, int, int, float]]:
+    contributions = []
+
+    for start in range(0, len(ids), _IDS_PER_QUERY):
+        query = (
+            select(Order.customer_id, Order.product_id, Order.qty, Product.price)
+            .join(Product, Order.product_id == Product.id)
+            .where(column.in_(ids[start:start + _IDS_PER_QUERY]))
+        )
+        contributions.extend(tuple(row) for row in session.execute(query))
+
+    return contributions
+
+
+def _apply(session: Session, contributions: Iterable[tuple[int, int, int, float]], sign: int) -> None:
+    deltas = {CustomerOrderStats: defaultdict(lambda: [0, 0, 0.0]), ProductSalesStats: defaultdict(lambda: [0, 0, 0.0])}
+
+    for customer_id, product_id, qty, price in contributions:
+        for stats_table, _id in ((CustomerOrderStats, customer_id), (ProductSalesStats, product_id)):
+            if _id is None:
+                continue
+
+            delta = deltas[stats_table][_id]
+            delta[0] += sign
+            delta[1] += sign * qty
+            delta[2] += sign * qty * price
+
+    dialect_name = session.get_bind().dialect.name
+
+    for stats_table, table_deltas in deltas.items():
+        rows = [
+            {"id": _id, "order_count": order_count, "total_qty": total_qty, "revenue": revenue}
+            for _id, (order_count, total_qty, revenue) in table_deltas.items()
+        ]
+
+        for start in range(0, len(rows), _ROWS_PER_UPSERT):
+            session.execute(_increment_statement(dialect_name, stats_table, rows[start:start + _ROWS_PER_UPSERT]))
+
+
+def _increment_statement(dialect_name: str, stats_table: Base, rows: list[dict]) -> Insert:
+    """
+        Inserts missing stats rows and increments existing ones in place, in one statement.
+
+        Concurrent writers neither lose each other updates nor fail creating the same row.
+    """
+    if dialect_name == "mysql":
+        statement = mysql.insert(stats_table).values(rows)
+        return statement.on_duplicate_key_update(
+            order_count=stats_table.order_count + statement.inserted.order_count,
+            total_qty=stats_table.total_qty + statement.inserted.total_qty,
+            revenue=stats_table.revenue + statement.inserted.revenue,
+        )
+
+    if dialect_name in ("postgresql", "sqlite"):
+        dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+        statement = dialect_insert(stats_table).values(rows)
+        return statement.on_conflict_do_update(
+            index_elements=["id"],
+            set_={
+                "order_count": stats_table.order_count + statement.excluded.order_count,
+                "total_qty": stats_table.total_qty + statement.excluded.total_qty,
+                "revenue": stats_table.revenue + statement.excluded.revenue,
+            },
+        )
+
+    raise InfrastructureException(f"Stats are not supported for {dialect_name} dialect")
+
+
+if __name__ == "__main__":
+    from src.engines import ENGINE_FACTORIES
+
+    parser = argparse.ArgumentParser(description="Rebuilds customer and product order stats tables")
+    parser.add_argument("engine", choices=sorted(ENGINE_FACTORIES))
+    arguments = parser.parse_args()
+
+    rebuild_stats(ENGINE_FACTORIES[arguments.engine]())
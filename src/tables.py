@@ -6,6 +6,7 @@ Base = declarative_base()
 
 class Customer(Base):
     __tablename__ = "customer"
+    __table_args__ = (sq.Index("ix_customer_email", "email"),)
 
     id = sq.Column(sq.Integer, primary_key=True)
     full_name = sq.Column(sq.String(255), nullable=False)
@@ -24,8 +25,43 @@ class Product(Base):
 
 class Order(Base):
     __tablename__ = "order"
+    # foreign keys are not indexed by Postgres and SQLite, without these joins and cascade deletes scan all orders
+    __table_args__ = (
+        sq.Index("ix_order_customer_id", "customer_id"),
+        sq.Index("ix_order_product_id", "product_id"),
+    )
 
     id = sq.Column(sq.Integer, primary_key=True)
     qty = sq.Column(sq.Integer, nullable=False)
     customer_id = sq.Column(sq.Integer, sq.ForeignKey("customer.id", ondelete="CASCADE"))
     product_id = sq.Column(sq.Integer, sq.ForeignKey("product.id", ondelete="CASCADE"))
+
+
+class CustomerOrderStats(Base):
+    """Per customer order totals, maintained on writes of orders, customers and products"""
+    __tablename__ = "customer_order_stats"
+
+    id = sq.Column(sq.Integer, sq.ForeignKey("customer.id", ondelete="CASCADE"), primary_key=True)
+    order_count = sq.Column(sq.Integer, nullable=False, default=0)
+    total_qty = sq.Column(sq.Integer, nullable=False, default=0)
+    revenue = sq.Column(sq.Float, nullable=False, default=0)
+
+
+class ProductSalesStats(Base):
+    """Per product order totals, maintained on writes of orders, customers and products"""
+    __tablename__ = "product_sales_stats"
+
+    id = sq.Column(sq.Integer, sq.ForeignKey("product.id", ondelete="CASCADE"), primary_key=True)
+    order_count = sq.Column(sq.Integer, nullable=False, default=0)
+    total_qty = sq.Column(sq.Integer, nullable=False, default=0)
+    revenue = sq.Column(sq.Float, nullable=False, default=0)
+
+
+class CustomerTrigram(Base):
+    """Trigrams of customer name and email, used for fuzzy lookup where pg_trgm is not available"""
+    __tablename__ = "customer_trigram"
+    # primary key starts with trigram, so it doesn't help removing trigrams of a customer
+    __table_args__ = (sq.Index("ix_customer_trigram_customer_id", "customer_id"),)
+
+    trigram = sq.Column(sq.String(3), primary_key=True)
+    customer_id = sq.Column(sq.Integer, sq.ForeignKey("customer.id", ondelete="CASCADE"), primary_key=True)
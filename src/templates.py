@@ -0,0 +1,53 @@
+import threading
+from typing import Callable
+
+from sqlalchemy import Engine
+
+from src.engines import memory_engine_factory
+from src.export import recreate_tables
+
+
+class DatabaseTemplate:
+    """
+        In-memory database with the shop schema and optional seed data, built once on first use.
+
+        Every `clone` is a new in-memory engine with a copy of the template made by SQLite backup API,
+        which is much faster than creating tables and indexes and seeding them again.
+    """
+
+    def __init__(self, seed: Callable[[Engine], None] | None = None) -> None:
+        self._seed = seed
+        self._engine: Engine | None = None
+        self._lock = threading.Lock()
+
+    def clone(self) -> Engine:
+        engine = memory_engine_factory()
+        source = self._template().raw_connection()
+        target = engine.raw_connection()
+
+        try:
+            source.driver_connection.backup(target.driver_connection)
+        finally:
+            target.close()
+            source.close()
+
+        return engine
+
+    def dispose(self) -> None:
+        with self._lock:
+            if self._engine is not None:
+                self._engine.dispose()
+                self._engine = None
+
+    def _template(self) -> Engine:
+        with self._lock:
+            if self._engine is None:
+                engine = memory_engine_factory()
+                recreate_tables(engine)
+
+                if self._seed is not None:
+                    self._seed(engine)
+
+                self._engine = engine
+
+            return self._engine
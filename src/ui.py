@@ -1,18 +1,145 @@
-from typing import Any
+from typing import Any, Callable
 
 import tkinter as tk
 from tkinter import messagebox
-from tkinter.ttk import Treeview
+
+from sqlalchemy import Engine
 
 from src.exceptions import InfrastructureException, InvalidDataError, RelationError
-from src.repositories import ProductRepository, CustomerRepository, OrderRepository
-from src.engines import (
-    mysql_engine_factory,
-    sqlite_engine_factory,
-    postgres_engine_factory,
-)
+from src.repositories import ProductRepository, CustomerRepository, OrderRepository, PROJECT_REPOSITORIES
+from src.engines import engines
+from src.background import BackgroundRunner
 from src.export import export_data
+from src.cache import LRUCache
+from src.config import REPOSITORY_CACHE_ENABLED, WRITE_BEHIND_ENABLED
 from src.constants import *
+from src.repeated_queries import watch_repeated_queries
+from src.repositories.abstract import IRepository
+from src.virtual_tree import VirtualTreeview
+from src.write_behind import WriteBehindQueue, WriteBehindRepository
+
+
+# shared by all windows, so switching between them doesn't drop warm entries
+_repository_cache = LRUCache() if REPOSITORY_CACHE_ENABLED else None
+# started by Window.run when write-behind is enabled
+_write_behind_queue: WriteBehindQueue | None = None
+# started by Window.run, all database work of windows goes through it
+_background_runner: BackgroundRunner | None = None
+# export buttons of the shown window, kept disabled while an export started from any window runs
+_export_buttons: tuple[tk.Button, ...] = ()
+_export_running = False
+
+
+def _repository(repository_class: type[IRepository], engine: Engine) -> IRepository | WriteBehindRepository:
+    repository = repository_class(engine, _repository_cache)
+
+    if _write_behind_queue is None:
+        return repository
+
+    return WriteBehindRepository(repository, _write_behind_queue)
+
+
+def _run_in_background(
+    owner: tk.Misc,
+    name: str,
+    function: Callable[[], Any],
+    on_success: Callable[[Any], None],
+    on_error: Callable[[InfrastructureException], None],
+    busy_widgets: tuple[tk.Widget, ...] = (),
+) -> None:
+    """
+        Runs database work on the worker pool, `busy_widgets` are disabled until it's done.
+
+        Callbacks are called on the Tk thread, unless the owner widget was destroyed in the meantime.
+    """
+    for widget in busy_widgets:
+        widget.configure(state=tk.DISABLED)
+
+    def _done(future) -> None:
+        for widget in busy_widgets:
+            if widget.winfo_exists():
+                widget.configure(state=tk.NORMAL)
+
+        try:
+            result = future.result()
+        except InfrastructureException as error:
+            on_error(error)
+        except Exception as err:  # a bug or a driver error the repositories don't wrap, the window must not hang
+            on_error(InfrastructureException(f"Something went wrong with {err.__class__.__name__}: {str(err)}"))
+        else:
+            on_success(result)
+
+    _background_runner.submit(watch_repeated_queries(name)(function), _done, owner)
+
+
+def _virtual_tree(
+    master: tk.Misc,
+    name: str,
+    load_page: Callable[[int | None, int, int | None], list[dict[str, Any]]],
+    on_error: Callable[[InfrastructureException], None],
+    page_size: int = TREE_PAGE_SIZE,
+    **kwargs,
+) -> VirtualTreeview:
+    """Treeview loading its pages in the background, failed pages are requested again later"""
+    def _submit(
+        function: Callable[[], Any],
+        on_loaded: Callable[[Any], None],
+        busy_widgets: tuple[tk.Widget, ...],
+    ) -> None:
+        def _failed(error: InfrastructureException) -> None:
+            tree.load_failed()
+            on_error(error)
+
+        _run_in_background(tree, name, function, on_loaded, _failed, busy_widgets)
+
+    tree = VirtualTreeview(
+        master,
+        load_page,
+        _submit,
+        page_size=page_size,
+        max_pages=TREE_MAX_PAGES,
+        prefetch_rows=TREE_PREFETCH_ROWS,
+        retry_ms=TREE_RETRY_MS,
+        **kwargs,
+    )
+    return tree
+
+
+def _register_export_buttons(*buttons: tk.Button) -> None:
+    global _export_buttons
+
+    _export_buttons = buttons
+
+    if _export_running:
+        for button in buttons:
+            button.configure(state=tk.DISABLED)
+
+
+def _export_in_background(from_engine: Engine, to_engine: Engine, description: str) -> None:
+    """Exports on the worker pool, the result is shown in a message box whichever window is open by then"""
+    global _export_running
+
+    _export_running = True
+    for button in _export_buttons:
+        button.configure(state=tk.DISABLED)
+
+    def _done(future) -> None:
+        global _export_running
+
+        _export_running = False
+        for button in _export_buttons:
+            if button.winfo_exists():
+                button.configure(state=tk.NORMAL)
+
+        try:
+            future.result()
+        except Exception as error:  # drivers raise their own errors while creating tables
+            messagebox.showerror("Export failed", f"{description} failed: {error}")
+        else:
+            messagebox.showinfo("Export finished", f"{description} finished")
+
+    export = watch_repeated_queries(description)(lambda: export_data(from_engine, to_engine))
+    _background_runner.submit(export, _done)
 
 
 def is_float(value: Any) -> bool:
@@ -41,22 +168,54 @@ class Window:
         self._window.resizable(False, False)
 
     def run(self) -> None:
+        global _write_behind_queue, _background_runner
+
+        _background_runner = BackgroundRunner(self._window, UI_WORKER_THREADS, BACKGROUND_POLL_MS)
+        self._window.protocol("WM_DELETE_WINDOW", self._close)
+
+        if WRITE_BEHIND_ENABLED:
+            engine = engines.get("mysql")
+            _write_behind_queue = WriteBehindQueue(
+                [repository_class(engine, _repository_cache) for repository_class in PROJECT_REPOSITORIES]
+            )
+            _write_behind_queue.start()
+
+            self._window.after(WRITE_FAILURES_POLL_MS, self._report_write_failures)
+
         application = CustomersWindow()
         application.initialize_menu()
 
         self._window.mainloop()
 
+    def _report_write_failures(self) -> None:
+        """Shows mutations the write-behind queue failed to save, polls itself while the window lives"""
+        for failure in _write_behind_queue.failures():
+            messagebox.showerror(
+                "Saving failed",
+                f"Could not {failure.operation} {failure.table_name} {failure.record_id or ''}: {failure.error}",
+            )
+
+        self._window.after(WRITE_FAILURES_POLL_MS, self._report_write_failures)
+
+    def _close(self) -> None:
+        _background_runner.shutdown()
+
+        if _write_behind_queue is not None:
+            _write_behind_queue.stop()
+
+        self._window.destroy()
+
 
 class CustomersWindow:
     def __init__(self) -> None:
-        self._mysql_engine = mysql_engine_factory()
+        self._mysql_engine = engines.get("mysql")
 
-        self._product_repository = ProductRepository(self._mysql_engine)
-        self._customer_repository = CustomerRepository(self._mysql_engine)
-        self._order_repository = OrderRepository(self._mysql_engine)
+        self._product_repository = _repository(ProductRepository, self._mysql_engine)
+        self._customer_repository = _repository(CustomerRepository, self._mysql_engine)
+        self._order_repository = _repository(OrderRepository, self._mysql_engine)
 
-        self._sqlite_engine = sqlite_engine_factory()
-        self._postgres_engine = postgres_engine_factory()
+        self._sqlite_engine = engines.get("sqlite")
+        self._postgres_engine = engines.get("postgres")
 
         self.frame = tk.Frame(bg=BACKGROUND)
         self.frame.pack()
@@ -68,6 +227,8 @@ class CustomersWindow:
         self.listbox_frame.pack()
 
         self.error_label = tk.Label()
+        self.status_label = None
+        self._action_buttons = ()
 
         self.customers_tree = None
         self.id_entry = None
@@ -135,6 +296,11 @@ class CustomersWindow:
             bg=FOREGROUND,
         )
         export_sqlite_button.grid(row=2, column=3)
+        _register_export_buttons(export_postgres_button, export_sqlite_button)
+
+        # shows what is being loaded or saved in the background
+        self.status_label = tk.Label(self.frame, text="", bg=BACKGROUND)
+        self.status_label.grid(row=1, column=1)
 
         # Create text box labels for Customers
         id_label = tk.Label(self.entry_frame, text="ID:", bg=BACKGROUND)
@@ -185,6 +351,7 @@ class CustomersWindow:
             bg=FOREGROUND,
         )
         delete_button.grid(row=4, column=2)
+        self._action_buttons = (add_button, update_button, delete_button)
 
         # creating listbox for customers
         self.listbox_frame = tk.Frame(bg=BACKGROUND)
@@ -196,8 +363,14 @@ class CustomersWindow:
         list_label.grid(row=0, column=0)
 
         # creating treeview
-        self.customers_tree = Treeview(
-            self.listbox_frame, columns=CUSTOMER_COLUMN_FULL, show="headings", height=10
+        self.customers_tree = _virtual_tree(
+            self.listbox_frame,
+            "CustomersWindow.load_page",
+            lambda after_id, limit, before_id: self._customer_repository.get_page(limit, after_id, before_id),
+            lambda error: self._show_error("Could not load customers. Please refer logs for more information."),
+            columns=CUSTOMER_COLUMN_FULL,
+            show="headings",
+            height=10,
         )
         self.customers_tree.grid(row=1, column=0)
 
@@ -206,20 +379,16 @@ class CustomersWindow:
             self.customers_tree.heading(column_name, text=column_name)
 
         scrollbar = tk.Scrollbar(self.listbox_frame, orient=tk.VERTICAL)
-        scrollbar.configure(command=self.customers_tree.set)
-        self.customers_tree.configure(yscrollcommand=scrollbar)
+        scrollbar.grid(row=1, column=1, sticky=tk.NS)
+        self.customers_tree.set_scrollbar(scrollbar)
         self.customers_tree.bind("<ButtonRelease-1>", self.get_selected_customer)
 
-        # adding records from DB to list
-        records = self._customer_repository.get_all()
-
-        for i, item in enumerate(records):
-            self.customers_tree.insert(
-                "",
-                index="end",
-                iid=i,
-                values=tuple(item[column] for column in CUSTOMER_COLUMN_FULL),
-            )
+        # adding records from DB to list page by page while scrolling, in the background so the window stays responsive
+        self.status_label.configure(text="Loading customers...")
+        self.customers_tree.reload(
+            lambda: self.status_label.configure(text=""),
+            busy_widgets=(update_button, delete_button),
+        )
 
     def _validate_input(self):
         if not self.full_name_entry.get():
@@ -240,19 +409,16 @@ class CustomersWindow:
         if not validation_result:
             return
 
-        try:
-            self._customer_repository.add(
-                {
-                    "full_name": self.full_name_entry.get(),
-                    "email": self.email_entry.get(),
-                }
-            )
-        except InfrastructureException:
-            self.error_message(
-                "Something went wrong during customer adding, in case if error persist please contact support.")
-            return
-        else:
-            self.initialize_menu()
+        data = {
+            "full_name": self.full_name_entry.get(),
+            "email": self.email_entry.get(),
+        }
+        self._save_in_background(
+            "CustomersWindow.add_customer",
+            lambda: self._customer_repository.add(data),
+            lambda error: self._show_error(
+                "Something went wrong during customer adding, in case if error persist please contact support."),
+        )
 
     def update_customer(self):
         """Updates customer, if all required entries are filled properly."""
@@ -267,15 +433,38 @@ class CustomersWindow:
         if not validation_result:
             return
 
-        self._customer_repository.update(
-            self.id_entry.get(),
-            {
-                "full_name": self.full_name_entry.get(),
-                "email": self.email_entry.get(),
-            },
+        _id = self.id_entry.get()
+        data = {
+            "full_name": self.full_name_entry.get(),
+            "email": self.email_entry.get(),
+        }
+        self._save_in_background(
+            "CustomersWindow.update_customer",
+            lambda: self._customer_repository.update(_id, data),
+            lambda error: self._show_error(
+                "Something went wrong during customer updating, in case if error persist please contact support."),
+        )
+
+    def _save_in_background(
+        self,
+        name: str,
+        function: Callable[[], Any],
+        on_error: Callable[[InfrastructureException], None],
+    ) -> None:
+        """Runs the write with action buttons disabled, the window is refreshed once it's saved"""
+        self.status_label.configure(text="Saving...")
+        _run_in_background(
+            self.entry_frame,
+            name,
+            function,
+            lambda result: self.initialize_menu(),
+            on_error,
+            busy_widgets=self._action_buttons,
         )
 
-        self.initialize_menu()
+    def _show_error(self, name: str) -> None:
+        self.status_label.configure(text="")
+        self.error_message(name)
 
     def error_message(self, name):
         if self.error_label:
@@ -298,8 +487,13 @@ class CustomersWindow:
 
         answer = messagebox.askquestion("Are you sure?")
         if answer == "yes":
-            self._customer_repository.delete(selected_record[CUSTOMER_COLUMN_FULL[0]])
-            self.initialize_menu()
+            _id = selected_record[CUSTOMER_COLUMN_FULL[0]]
+            self._save_in_background(
+                "CustomersWindow.delete_customer",
+                lambda: self._customer_repository.delete(_id),
+                lambda error: self._show_error(
+                    "Something went wrong during customer deleting, in case if error persist please contact support."),
+            )
         else:
             self.error_message("record not exists in database.")
 
@@ -342,23 +536,23 @@ class CustomersWindow:
         application.initialize_menu()
 
     def _export_from_mysql_to_postgres(self) -> None:
-        export_data(self._mysql_engine, self._postgres_engine)
+        _export_in_background(self._mysql_engine, self._postgres_engine, "Export from MySQL to Postgres")
 
     def _export_from_postgres_to_sqlite(self) -> None:
-        export_data(self._postgres_engine, self._sqlite_engine)
+        _export_in_background(self._postgres_engine, self._sqlite_engine, "Export from Postgres to Sqlite")
 
 
 class ProductsWindow:
     def __init__(self) -> None:
         """Creates products window."""
 
-        self._mysql_engine = mysql_engine_factory()
-        self._product_repository = ProductRepository(self._mysql_engine)
-        self._customer_repository = CustomerRepository(self._mysql_engine)
-        self._order_repository = OrderRepository(self._mysql_engine)
+        self._mysql_engine = engines.get("mysql")
+        self._product_repository = _repository(ProductRepository, self._mysql_engine)
+        self._customer_repository = _repository(CustomerRepository, self._mysql_engine)
+        self._order_repository = _repository(OrderRepository, self._mysql_engine)
 
-        self._sqlite_engine = sqlite_engine_factory()
-        self._postgres_engine = postgres_engine_factory()
+        self._sqlite_engine = engines.get("sqlite")
+        self._postgres_engine = engines.get("postgres")
 
         # frame for main buttons (customer,order,product)
         self.frame = tk.Frame(bg=BACKGROUND)
@@ -372,6 +566,8 @@ class ProductsWindow:
 
         # label that need to be defined in __init__ so functions can check if it exists and delete it
         self.error_label = tk.Label()
+        self.status_label = None
+        self._action_buttons = ()
 
         self.product_tree = None
         self.product_description_entry = None
@@ -444,6 +640,11 @@ class ProductsWindow:
             bg=FOREGROUND,
         )
         export_sqlite_button.grid(row=2, column=3)
+        _register_export_buttons(export_postgres_button, export_sqlite_button)
+
+        # shows what is being loaded or saved in the background
+        self.status_label = tk.Label(self.frame, text="", bg=BACKGROUND)
+        self.status_label.grid(row=1, column=1)
 
         # Create text box labels for Products
         product_ID_label = tk.Label(self.entry_frame, text="Product ID:", bg=BACKGROUND)
@@ -506,6 +707,7 @@ class ProductsWindow:
             bg=FOREGROUND,
         )
         delete_button.grid(row=4, column=2)
+        self._action_buttons = (add_button, update_button, delete_button)
 
         list_label = tk.Label(
             self.listbox_frame, text="list of products", width=100, bg=BACKGROUND
@@ -513,8 +715,14 @@ class ProductsWindow:
         list_label.grid(row=0, column=0)
 
         # creating treeview
-        self.product_tree = Treeview(
-            self.listbox_frame, columns=PRODUCTS_COLUMNS, show="headings", height=10
+        self.product_tree = _virtual_tree(
+            self.listbox_frame,
+            "ProductsWindow.load_page",
+            lambda after_id, limit, before_id: self._product_repository.get_page(limit, after_id, before_id),
+            lambda error: self._show_error("Could not load products, in case if error persist please contact support."),
+            columns=PRODUCTS_COLUMNS,
+            show="headings",
+            height=10,
         )
         self.product_tree.grid(row=1, column=0)
 
@@ -523,19 +731,16 @@ class ProductsWindow:
             self.product_tree.heading(column_name, text=column_name)
 
         scrollbar = tk.Scrollbar(self.listbox_frame, orient=tk.VERTICAL)
-        scrollbar.configure(command=self.product_tree.set)
-        self.product_tree.configure(yscrollcommand=scrollbar)
+        scrollbar.grid(row=1, column=1, sticky=tk.NS)
+        self.product_tree.set_scrollbar(scrollbar)
         self.product_tree.bind("<ButtonRelease-1>", self.get_selected_product)
 
-        records = self._product_repository.get_all()
-
-        for i, item in enumerate(records):
-            self.product_tree.insert(
-                "",
-                index="end",
-                iid=i,
-                values=tuple(item[column] for column in PRODUCTS_COLUMNS),
-            )
+        # loaded page by page while scrolling, in the background so the window stays responsive
+        self.status_label.configure(text="Loading products...")
+        self.product_tree.reload(
+            lambda: self.status_label.configure(text=""),
+            busy_widgets=(update_button, delete_button),
+        )
 
     def clear_product_entries(self):
         """Clears all entries."""
@@ -562,19 +767,19 @@ class ProductsWindow:
         ):
             self.error_message("'product price' must be positive float")
 
-        # if everything is filled
+        # if everything is filled, window is refreshed once the product is saved
         else:
-            self._product_repository.add(
-                {
-                    "name": self.product_name_entry.get(),
-                    "price": self.product_price_entry.get(),
-                    "description": self.product_description_entry.get(),
-                }
+            data = {
+                "name": self.product_name_entry.get(),
+                "price": self.product_price_entry.get(),
+                "description": self.product_description_entry.get(),
+            }
+            self._save_in_background(
+                "ProductsWindow.add_product",
+                lambda: self._product_repository.add(data),
+                lambda error: self._show_error("Impossible to add product. Please refer logs for more information."),
             )
 
-            # showing clear new window
-            self.initialize_menu()
-
     def delete_product(self):
         """Deletes product, if selected by cursor."""
         if self.error_label:
@@ -591,9 +796,13 @@ class ProductsWindow:
         # window asking to delete
         answer = messagebox.askquestion("Are you sure?")
         if answer == "yes":
-            self._product_repository.delete(selected_record[PRODUCTS_COLUMNS[0]])
-            # refreshing all
-            self.initialize_menu()
+            _id = selected_record[PRODUCTS_COLUMNS[0]]
+            # refreshing all once it's deleted
+            self._save_in_background(
+                "ProductsWindow.delete_product",
+                lambda: self._product_repository.delete(_id),
+                lambda error: self._show_error("Impossible to delete product. Please refer logs for more information."),
+            )
 
         # if there was no record with such id
         else:
@@ -618,17 +827,40 @@ class ProductsWindow:
         # everything is filled finally updating
         else:
             current_record = self.product_tree.set(self.product_tree.selection())
-            self._product_repository.update(
-                int(self.product_id_entry.get()),
-                {
-                    "full_name": self.product_name_entry.get(),
-                    "email": self.product_price_entry.get(),
-                    "description": self.product_description_entry,
-                },
+            _id = int(self.product_id_entry.get())
+            data = {
+                "full_name": self.product_name_entry.get(),
+                "email": self.product_price_entry.get(),
+                "description": self.product_description_entry,
+            }
+
+            # refresh all once it's updated
+            self._save_in_background(
+                "ProductsWindow.update_product",
+                lambda: self._product_repository.update(_id, data),
+                lambda error: self._show_error("Impossible to update product. Please refer logs for more information."),
             )
 
-            # refresh all
-            self.initialize_menu()
+    def _save_in_background(
+        self,
+        name: str,
+        function: Callable[[], Any],
+        on_error: Callable[[InfrastructureException], None],
+    ) -> None:
+        """Runs the write with action buttons disabled, the window is refreshed once it's saved"""
+        self.status_label.configure(text="Saving...")
+        _run_in_background(
+            self.entry_frame,
+            name,
+            function,
+            lambda result: self.initialize_menu(),
+            on_error,
+            busy_widgets=self._action_buttons,
+        )
+
+    def _show_error(self, name: str) -> None:
+        self.status_label.configure(text="")
+        self.error_message(name)
 
     def get_selected_product(self, event):
         """Inserts selected product data into entries."""
@@ -678,22 +910,22 @@ class ProductsWindow:
         application.initialize_menu()
 
     def _export_from_mysql_to_postgres(self) -> None:
-        export_data(self._mysql_engine, self._postgres_engine)
+        _export_in_background(self._mysql_engine, self._postgres_engine, "Export from MySQL to Postgres")
 
     def _export_from_postgres_to_sqlite(self) -> None:
-        export_data(self._postgres_engine, self._sqlite_engine)
+        _export_in_background(self._postgres_engine, self._sqlite_engine, "Export from Postgres to Sqlite")
 
 
 class OrdersMenu:
     def __init__(self):
         """Creates orders window."""
-        self._mysql_engine = mysql_engine_factory()
-        self._product_repository = ProductRepository(self._mysql_engine)
-        self._customer_repository = CustomerRepository(self._mysql_engine)
-        self._order_repository = OrderRepository(self._mysql_engine)
+        self._mysql_engine = engines.get("mysql")
+        self._product_repository = _repository(ProductRepository, self._mysql_engine)
+        self._customer_repository = _repository(CustomerRepository, self._mysql_engine)
+        self._order_repository = _repository(OrderRepository, self._mysql_engine)
 
-        self._sqlite_engine = sqlite_engine_factory()
-        self._postgres_engine = postgres_engine_factory()
+        self._sqlite_engine = engines.get("sqlite")
+        self._postgres_engine = engines.get("postgres")
 
         # frame for main buttons (customer,order,product)
         self.frame = tk.Frame(bg=BACKGROUND)
@@ -704,15 +936,13 @@ class OrdersMenu:
         # frame for listbox and scrollbar
         self.orders_frame = tk.Frame(bg=BACKGROUND)
         self.orders_frame.pack()
-        self.products_customers_frame = tk.Frame(bg=BACKGROUND)
-        self.products_customers_frame.pack()
 
         # label that need to be defined in __init__ so functions can check if it exists and delete it
         self.error_label = tk.Label()
+        self.status_label = None
+        self._action_buttons = ()
 
         self.order_tree = None
-        self.product_tree = None
-        self.customers_tree = None
         self.id_order = None
         self.id_product_entry = None
         self.id_customer_entry = None
@@ -735,10 +965,6 @@ class OrdersMenu:
         self.orders_frame = tk.Frame(bg=BACKGROUND)
         self.orders_frame.pack()
 
-        self.products_customers_frame.destroy()
-        self.products_customers_frame = tk.Frame(bg=BACKGROUND)
-        self.products_customers_frame.pack()
-
         if self.error_label:
             self.error_label.destroy()
 
@@ -787,6 +1013,11 @@ class OrdersMenu:
             bg=FOREGROUND,
         )
         export_sqlite_button.grid(row=2, column=3)
+        _register_export_buttons(export_postgres_button, export_sqlite_button)
+
+        # shows what is being loaded or saved in the background
+        self.status_label = tk.Label(self.frame, text="", bg=BACKGROUND)
+        self.status_label.grid(row=1, column=1)
 
         # Create text box labels for Orders
         id_order_label = tk.Label(self.entry_frame, text="Order ID:", bg=BACKGROUND)
@@ -843,109 +1074,45 @@ class OrdersMenu:
             bg=FOREGROUND,
         )
         delete_button.grid(row=4, column=2)
+        self._action_buttons = (add_button, update_button, delete_button)
 
         #  =================creating treeview (orders) =======================
         list_label = tk.Label(self.orders_frame, text="Orders", bg=BACKGROUND)
         list_label.grid(row=0, column=0)
 
-        self.order_tree = Treeview(
-            self.orders_frame, columns=ORDERS_COLUMNS, show="headings", height=8
+        self.order_tree = _virtual_tree(
+            self.orders_frame,
+            "OrdersMenu.load_page",
+            lambda after_id, limit, before_id: self._order_repository.get_order_views(
+                limit, after_id=after_id, before_id=before_id
+            ),
+            lambda error: self._show_error("Could not load orders. Please refer logs for more information."),
+            page_size=ORDERS_PAGE_SIZE,
+            columns=ORDER_VIEW_COLUMNS,
+            show="headings",
+            height=20,
         )
         self.order_tree.grid(row=1, column=0, padx=100)
 
         scrollbar_y = tk.Scrollbar(self.orders_frame, orient=tk.VERTICAL)
-        scrollbar_y.configure(command=self.order_tree.set)
+        scrollbar_y.grid(row=1, column=1, sticky=tk.NS)
+        self.order_tree.set_scrollbar(scrollbar_y)
         scrollbar_x = tk.Scrollbar(self.orders_frame, orient=tk.HORIZONTAL)
         scrollbar_x.configure(command=self.order_tree.xview())
-        self.order_tree.configure(yscrollcommand=scrollbar_y)
         self.order_tree.configure(xscrollcommand=scrollbar_x)
 
-        for column_name, width in zip(ORDERS_COLUMNS, ORDER_COLUMNS_SIZE):
+        for column_name, width in zip(ORDER_VIEW_COLUMNS, ORDER_VIEW_COLUMNS_SIZE):
             self.order_tree.column(column_name, width=width, anchor=tk.CENTER)
             self.order_tree.heading(column_name, text=column_name)
             self.order_tree.bind("<ButtonRelease-1>", self.get_selected_order)
 
-        #  =================creating treeview (products) =======================
-        list_label1 = tk.Label(
-            self.products_customers_frame, text="Products", width=25, bg=BACKGROUND
+        # adding records from DB to List (orders joined with their customers and products) page by page
+        # while scrolling, they are loaded in the background so the window stays responsive
+        self.status_label.configure(text="Loading orders...")
+        self.order_tree.reload(
+            lambda: self.status_label.configure(text=""),
+            busy_widgets=(update_button, delete_button),
         )
-        list_label1.grid(row=0, column=0)
-
-        self.product_tree = Treeview(
-            self.products_customers_frame,
-            columns=PRODUCTS_COLUMNS,
-            show="headings",
-            height=8,
-        )
-        self.product_tree.grid(row=1, column=0, padx=10)
-        scrollbar_y = tk.Scrollbar(self.products_customers_frame, orient=tk.VERTICAL)
-        scrollbar_y.configure(command=self.product_tree.set)
-        scrollbar_x = tk.Scrollbar(self.products_customers_frame, orient=tk.HORIZONTAL)
-        scrollbar_x.configure(command=self.order_tree.xview())
-        self.product_tree.configure(yscrollcommand=scrollbar_y)
-        self.product_tree.configure(xscrollcommand=scrollbar_x)
-
-        for column_name, width in zip(PRODUCTS_COLUMNS, PRODUCT_COLUMNS_SIZE):
-            self.product_tree.column(column_name, width=width, anchor=tk.CENTER)
-            self.product_tree.heading(column_name, text=column_name)
-
-        #  =================creating treeview (customers) =======================
-        list_label2 = tk.Label(
-            self.products_customers_frame, text="Customers", width=25, bg=BACKGROUND
-        )
-        list_label2.grid(row=0, column=1)
-        self.customers_tree = Treeview(
-            self.products_customers_frame,
-            columns=CUSTOMERS_COLUMNS,
-            show="headings",
-            height=8,
-        )
-        self.customers_tree.grid(row=1, column=1)
-
-        scrollbar_y = tk.Scrollbar(self.products_customers_frame, orient=tk.VERTICAL)
-        scrollbar_y.configure(command=self.customers_tree.set)
-        scrollbar_x = tk.Scrollbar(self.products_customers_frame, orient=tk.HORIZONTAL)
-        scrollbar_x.configure(command=self.order_tree.xview())
-        self.customers_tree.configure(yscrollcommand=scrollbar_y)
-        self.customers_tree.configure(xscrollcommand=scrollbar_x)
-
-        for column_name, width in zip(CUSTOMERS_COLUMNS, CUSTOMER_COLUMNS_SIZE):
-            self.customers_tree.column(column_name, width=width, anchor=tk.CENTER)
-            self.customers_tree.heading(column_name, text=column_name)
-
-        # # adding records from DB to List (orders)
-
-        records = self._order_repository.get_all()
-
-        for i, item in enumerate(records):
-            self.order_tree.insert(
-                "",
-                index="end",
-                iid=i,
-                values=tuple(item[column] for column in ORDERS_COLUMNS),
-            )
-
-        # # adding records from DB to List (products)
-        records = self._product_repository.get_all()
-
-        for i, item in enumerate(records):
-            self.product_tree.insert(
-                "",
-                index="end",
-                iid=i,
-                values=tuple(item[column] for column in PRODUCTS_COLUMNS),
-            )
-
-        # adding records from DB to List (customers)
-        records = self._customer_repository.get_all()
-
-        for i, item in enumerate(records):
-            self.customers_tree.insert(
-                "",
-                index="end",
-                iid=i,
-                values=tuple(item[column] for column in CUSTOMER_COLUMN_FULL),
-            )
 
     def add_order(self):
         """Place new order, if all required entries are filled."""
@@ -965,24 +1132,17 @@ class OrdersMenu:
             self.error_message("'quantity' Must be an positive integer")
 
         else:
-            try:
-                self._order_repository.add(
-                    {
-                        "customer_id": self.id_customer_entry.get(),
-                        "product_id": self.id_product_entry.get(),
-                        "qty": self.quantity_entry.get(),
-                    }
-                )
-            except InvalidDataError:
-                self.error_message("Impossible to add order, because of invalid input.")
-            except RelationError:
-                self.error_message("Impossible to add order, because customer and/or product does not exists.")
-            except InfrastructureException as error:
-                self.error_message("Impossible to add order. Please refer logs for more information.")
-                print(f"Error occurred: {error}")
-            else:
-                # showing clear new window
-                self.initialize_menu()
+            data = {
+                "customer_id": self.id_customer_entry.get(),
+                "product_id": self.id_product_entry.get(),
+                "qty": self.quantity_entry.get(),
+            }
+            # showing clear new window once it's saved
+            self._save_in_background(
+                "OrdersMenu.add_order",
+                lambda: self._order_repository.add(data),
+                self._show_order_error,
+            )
 
     def update_order(self):
         """Updates customer, if all required entries are filled properly."""
@@ -1002,25 +1162,48 @@ class OrdersMenu:
 
         # everything is filled finally updating
         else:
-            try:
-                self._order_repository.update(
-                    int(self.id_order_entry.get()),
-                    {
-                        "customer_id": self.id_customer_entry.get(),
-                        "product_id": self.id_product_entry.get(),
-                        "qty": self.quantity_entry.get(),
-                    },
-                )
-            except InvalidDataError:
-                self.error_message("Impossible to add order, because of invalid input.")
-            except RelationError:
-                self.error_message("Impossible to add order, because customer and/or product does not exists.")
-            except InfrastructureException as error:
-                self.error_message("Impossible to add order. Please refer logs for more information.")
-                print(f"Error occurred: {error}")
-            else:
-                # showing clear new window
-                self.initialize_menu()
+            _id = int(self.id_order_entry.get())
+            data = {
+                "customer_id": self.id_customer_entry.get(),
+                "product_id": self.id_product_entry.get(),
+                "qty": self.quantity_entry.get(),
+            }
+            # showing clear new window once it's saved
+            self._save_in_background(
+                "OrdersMenu.update_order",
+                lambda: self._order_repository.update(_id, data),
+                self._show_order_error,
+            )
+
+    def _save_in_background(
+        self,
+        name: str,
+        function: Callable[[], Any],
+        on_error: Callable[[InfrastructureException], None],
+    ) -> None:
+        """Runs the write with action buttons disabled, the window is refreshed once it's saved"""
+        self.status_label.configure(text="Saving...")
+        _run_in_background(
+            self.entry_frame,
+            name,
+            function,
+            lambda result: self.initialize_menu(),
+            on_error,
+            busy_widgets=self._action_buttons,
+        )
+
+    def _show_order_error(self, error: InfrastructureException) -> None:
+        if isinstance(error, InvalidDataError):
+            self._show_error("Impossible to add order, because of invalid input.")
+        elif isinstance(error, RelationError):
+            self._show_error("Impossible to add order, because customer and/or product does not exists.")
+        else:
+            self._show_error("Impossible to add order. Please refer logs for more information.")
+            print(f"Error occurred: {error}")
+
+    def _show_error(self, name: str) -> None:
+        self.status_label.configure(text="")
+        self.error_message(name)
 
     def delete_order(self):
         """Deletes order, if selected by cursor."""
@@ -1038,9 +1221,13 @@ class OrdersMenu:
         # window asking to delete
         answer = messagebox.askquestion("Are you sure?")
         if answer == "yes":
-            self._order_repository.delete(selected_record[ORDERS_COLUMNS[0]])
-            # refreshing all
-            self.initialize_menu()
+            _id = selected_record[ORDERS_COLUMNS[0]]
+            # refreshing all once it's deleted
+            self._save_in_background(
+                "OrdersMenu.delete_order",
+                lambda: self._order_repository.delete(_id),
+                lambda error: self._show_error("Impossible to delete order. Please refer logs for more information."),
+            )
 
         # if there was no record with such id
         else:
@@ -1091,7 +1278,6 @@ class OrdersMenu:
         self.frame.destroy()
         self.entry_frame.destroy()
         self.orders_frame.destroy()
-        self.products_customers_frame.destroy()
         application = CustomersWindow()
         application.initialize_menu()
 
@@ -1100,12 +1286,11 @@ class OrdersMenu:
         self.frame.destroy()
         self.entry_frame.destroy()
         self.orders_frame.destroy()
-        self.products_customers_frame.destroy()
         application = ProductsWindow()
         application.initialize_menu()
 
     def _export_from_mysql_to_postgres(self) -> None:
-        export_data(self._mysql_engine, self._postgres_engine)
+        _export_in_background(self._mysql_engine, self._postgres_engine, "Export from MySQL to Postgres")
 
     def _export_from_postgres_to_sqlite(self) -> None:
-        export_data(self._postgres_engine, self._sqlite_engine)
+        _export_in_background(self._postgres_engine, self._sqlite_engine, "Export from Postgres to Sqlite")
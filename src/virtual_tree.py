@@ -0,0 +1,194 @@
+from collections import deque
+from typing import Any, Callable
+
+import tkinter as tk
+from tkinter.ttk import Treeview
+
+
+# loads up to `limit` rows ordered by key, the ones after `after_key` (None for the first page) or,
+# when `before_key` is passed, the last ones before it
+PageLoader = Callable[[int | None, int, int | None], list[dict[str, Any]]]
+# runs the loader off the Tk thread and passes its rows to the callback on the Tk thread,
+# passed widgets are disabled until the load is done
+PageSubmitter = Callable[
+    [Callable[[], list[dict[str, Any]]], Callable[[list[dict[str, Any]]], None], tuple[tk.Widget, ...]],
+    None,
+]
+
+
+class VirtualTreeview(Treeview):
+    """
+        Treeview holding only a few pages of a table around the viewport, loaded with keyset pagination.
+
+        The next page is requested once fewer than `prefetch_rows` loaded rows are left below the viewport,
+        pages above the viewport are loaded back the same way, before the first loaded key, while scrolling up.
+        When more than `max_pages` are loaded, the page farthest from the viewport is dropped, so time to first rows
+        and memory don't grow with the table. Row ids of the tree are keys of rows, so selection survives page loads.
+        A failed page is requested again on the next scroll, a failed first page after `retry_ms`,
+        since an empty tree has nothing to scroll.
+    """
+
+    def __init__(
+        self,
+        master: tk.Misc,
+        load_page: PageLoader,
+        submit: PageSubmitter,
+        page_size: int,
+        key: str = "id",
+        max_pages: int = 5,
+        prefetch_rows: int = 20,
+        retry_ms: int = 2000,
+        **kwargs,
+    ) -> None:
+        super().__init__(master, **kwargs)
+        self._load_page = load_page
+        self._submit = submit
+        self._page_size = page_size
+        self._key = key
+        self._max_pages = max_pages
+        self._prefetch_rows = prefetch_rows
+        self._retry_ms = retry_ms
+
+        # keys of rows of loaded pages
+        self._pages: deque[list[str]] = deque()
+        self._more_above = False
+        self._reached_end = False
+        self._loading = False
+        self._generation = 0
+        self._first_page_callbacks: tuple[Callable[[], None] | None, tuple[tk.Widget, ...]] = (None, ())
+        self._scrollbar: tk.Scrollbar | None = None
+
+        super().configure(yscrollcommand=self._on_scroll)
+
+    def set_scrollbar(self, scrollbar: tk.Scrollbar) -> None:
+        self._scrollbar = scrollbar
+        scrollbar.configure(command=self.yview)
+
+    def reload(
+        self,
+        on_loaded: Callable[[], None] | None = None,
+        busy_widgets: tuple[tk.Widget, ...] = (),
+    ) -> None:
+        """Drops loaded rows and loads the first page, `busy_widgets` are disabled until `on_loaded` is called"""
+        self._generation += 1
+        self.delete(*self.get_children())
+        self._pages.clear()
+        self._more_above = False
+        self._reached_end = False
+        self._loading = False
+        self._first_page_callbacks = (on_loaded, busy_widgets)
+
+        self._request(None, at_top=False, on_loaded=on_loaded, busy_widgets=busy_widgets)
+
+    def load_failed(self) -> None:
+        """Call it when a submitted load fails, the page is requested again on the next scroll or after a while"""
+        self._loading = False
+
+        if not self._pages:
+            self.after(self._retry_ms, self._retry_first_page, self._generation)
+
+    def _retry_first_page(self, generation: int) -> None:
+        # skipped after reload, which requests the first page itself, or when the window is gone by now
+        if generation != self._generation or self._loading or self._pages or not self.winfo_exists():
+            return
+
+        on_loaded, busy_widgets = self._first_page_callbacks
+        self._request(None, at_top=False, on_loaded=on_loaded, busy_widgets=busy_widgets)
+
+    def _on_scroll(self, first: str, last: str) -> None:
+        if self._scrollbar is not None:
+            self._scrollbar.set(first, last)
+
+        if self._loading or not self._pages:
+            return
+
+        children = len(self.get_children())
+        first_row = float(first) * children
+        last_row = float(last) * children
+
+        if not self._reached_end and children - last_row < self._prefetch_rows:
+            self._request(self._last_key(), at_top=False)
+        elif self._more_above and first_row < self._prefetch_rows:
+            self._request(self._first_key(), at_top=True)
+
+    def _request(
+        self,
+        key: int | None,
+        at_top: bool,
+        on_loaded: Callable[[], None] | None = None,
+        busy_widgets: tuple[tk.Widget, ...] = (),
+    ) -> None:
+        self._loading = True
+        generation = self._generation
+
+        def _show(rows: list[dict[str, Any]]) -> None:
+            # rows of a page requested before reload
+            if generation != self._generation:
+                return
+
+            self._loading = False
+            self._add_page(rows, at_top)
+
+            if on_loaded is not None:
+                on_loaded()
+
+        def _load() -> list[dict[str, Any]]:
+            if at_top:
+                return self._load_page(None, self._page_size, key)
+            return self._load_page(key, self._page_size, None)
+
+        self._submit(_load, _show, busy_widgets)
+
+    def _add_page(self, rows: list[dict[str, Any]], at_top: bool) -> None:
+        anchor = self._top_visible_key()
+        columns = self["columns"]
+        keys = []
+
+        for row in rows:
+            key = str(row[self._key])
+            # rows written since the neighbouring page was loaded may shift page bounds onto loaded rows
+            if self.exists(key):
+                continue
+
+            values = tuple(row[column] for column in columns)
+            self.insert("", index=len(keys) if at_top else "end", iid=key, values=values)
+            keys.append(key)
+
+        if at_top:
+            self._more_above = len(rows) == self._page_size
+            if keys:
+                self._pages.appendleft(keys)
+        else:
+            self._reached_end = len(rows) < self._page_size
+            if keys:
+                self._pages.append(keys)
+
+        while len(self._pages) > self._max_pages:
+            if at_top:
+                # more rows are below again, they are loaded after the last remaining key
+                self.delete(*self._pages.pop())
+                self._reached_end = False
+            else:
+                # and above, they are loaded before the first remaining key
+                self.delete(*self._pages.popleft())
+                self._more_above = True
+
+        if anchor is not None and self.exists(anchor):
+            self._scroll_to(anchor)
+
+    def _top_visible_key(self) -> str | None:
+        children = self.get_children()
+        if not children:
+            return None
+
+        return children[min(len(children) - 1, int(self.yview()[0] * len(children)))]
+
+    def _scroll_to(self, key: str) -> None:
+        """Keeps the row that was on top of the viewport there, after rows above it were added or dropped"""
+        self.yview_moveto(self.index(key) / len(self.get_children()))
+
+    def _first_key(self) -> int:
+        return int(self._pages[0][0])
+
+    def _last_key(self) -> int:
+        return int(self._pages[-1][-1])
@@ -0,0 +1,319 @@
+import json
+import logging
+import queue
+import threading
+from typing import Any, NamedTuple
+
+import sqlalchemy as sq
+from sqlalchemy import Engine, create_engine, delete, event, insert, select, update
+from sqlalchemy.exc import DBAPIError, IntegrityError, DataError
+from sqlalchemy.orm import Session
+
+from src.config import (
+    WRITE_BEHIND_JOURNAL_URL,
+    WRITE_BEHIND_BATCH_SIZE,
+    WRITE_BEHIND_FLUSH_INTERVAL_SECONDS,
+    WRITE_BEHIND_MAX_ATTEMPTS,
+    WRITE_BEHIND_RETRY_INITIAL_SECONDS,
+    WRITE_BEHIND_RETRY_MAX_SECONDS,
+)
+from src.exceptions import InfrastructureException, InvalidDataError, RelationError
+from src.repositories.abstract import IRepository
+
+
+write_behind_logger = logging.getLogger("src.write_behind")
+
+# can't connect, server has gone away, lost connection, lock wait timeout, deadlock
+_TRANSIENT_MYSQL_ERRORS = {2002, 2003, 2006, 2013, 1205, 1213}
+# connection exceptions class, serialization failure, deadlock, lock not available, server shutting down or starting
+_TRANSIENT_POSTGRES_STATES = ("08", "40001", "40P01", "55P03", "57P01", "57P02", "57P03")
+# SQLITE_BUSY and SQLITE_LOCKED, extended codes keep the primary one in the lowest byte
+_TRANSIENT_SQLITE_ERRORS = {5, 6}
+
+_journal_metadata = sq.MetaData()
+
+_mutation_table = sq.Table(
+    "mutation",
+    _journal_metadata,
+    sq.Column("id", sq.Integer, primary_key=True, autoincrement=True),
+    sq.Column("table_name", sq.String(255), nullable=False),
+    sq.Column("operation", sq.String(16), nullable=False),
+    sq.Column("record_id", sq.Integer, nullable=True),
+    sq.Column("payload", sq.Text, nullable=True),
+    sq.Column("error", sq.Text, nullable=True),
+)
+
+
+class WriteFailure(NamedTuple):
+    table_name: str
+    operation: str
+    record_id: int | None
+    data: dict[str, Any] | None
+    error: InfrastructureException
+
+
+class WriteBehindQueue:
+    """
+        Accepts mutations into a local SQLite journal and applies them to repositories engine in the background.
+
+        Pending mutations are applied in journal order, up to `batch_size` of them in one transaction.
+        When a batch fails, its mutations are retried one by one, so only the broken ones are reported
+        through `failures` and kept in the journal with their error. Transient errors, like a lost connection,
+        are not failures, pending mutations are applied again with growing delays until the database is back.
+        A mutation still failing after `max_attempts` is reported like any other broken one.
+        Mutations left from a previous run are applied once the worker starts.
+    """
+
+    def __init__(
+        self,
+        repositories: list[IRepository],
+        journal_url: str = WRITE_BEHIND_JOURNAL_URL,
+        batch_size: int = WRITE_BEHIND_BATCH_SIZE,
+        flush_interval: float = WRITE_BEHIND_FLUSH_INTERVAL_SECONDS,
+        max_attempts: int = WRITE_BEHIND_MAX_ATTEMPTS,
+    ) -> None:
+        self._repositories = {repository.table_name: repository for repository in repositories}
+        engines = {repository.engine for repository in repositories}
+        if len(engines) != 1:
+            raise ValueError("All repositories of the queue must share one engine")
+
+        self._engine = engines.pop()
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._max_attempts = max_attempts
+        # failed attempts of mutations by their id, only the worker thread touches it
+        self._attempts: dict[int, int] = {}
+
+        self._journal = _journal_engine_factory(journal_url)
+        _journal_metadata.create_all(self._journal)
+
+        self._failures: queue.Queue[WriteFailure] = queue.Queue()
+        self._wake_up = threading.Event()
+        self._stopping = threading.Event()
+        self._idle = threading.Event()
+        self._worker: threading.Thread | None = None
+
+    def submit(self, table_name: str, operation: str, _id: int | None = None, data: dict[str, Any] | None = None) -> None:
+        if table_name not in self._repositories:
+            raise ValueError(f"No repository for {table_name} table")
+
+        with self._journal.begin() as connection:
+            connection.execute(
+                insert(_mutation_table).values(
+                    table_name=table_name,
+                    operation=operation,
+                    record_id=None if _id is None else int(_id),
+                    payload=None if data is None else json.dumps(data),
+                )
+            )
+
+        self._idle.clear()
+        self._wake_up.set()
+
+    def start(self) -> None:
+        if self._worker is not None:
+            return
+
+        self._stopping.clear()
+        self._worker = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._worker.start()
+        self._wake_up.set()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Applies pending mutations and stops the worker"""
+        if self._worker is None:
+            return
+
+        self._stopping.set()
+        self._wake_up.set()
+        self._worker.join(timeout)
+        self._worker = None
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Waits until all pending mutations are applied or failed, returns False on timeout"""
+        self._wake_up.set()
+        return self._idle.wait(timeout)
+
+    def pending_count(self) -> int:
+        with self._journal.connect() as connection:
+            query = select(sq.func.count()).select_from(_mutation_table).where(_mutation_table.c.error.is_(None))
+            return connection.scalar(query)
+
+    def failures(self) -> list[WriteFailure]:
+        """Failures reported since the previous call, safe to poll from the UI thread"""
+        failures = []
+
+        while True:
+            try:
+                failures.append(self._failures.get_nowait())
+            except queue.Empty:
+                return failures
+
+    def _run(self) -> None:
+        retry_delay = None
+
+        while True:
+            self._wake_up.wait(self._flush_interval if retry_delay is None else retry_delay)
+            self._wake_up.clear()
+
+            try:
+                while self._apply_next_batch():
+                    pass
+            except Exception as err:  # the worker must outlive both databases being unavailable
+                retry_delay = min(
+                    WRITE_BEHIND_RETRY_MAX_SECONDS,
+                    WRITE_BEHIND_RETRY_INITIAL_SECONDS if retry_delay is None else retry_delay * 2,
+                )
+                write_behind_logger.warning(
+                    "applying pending mutations failed with %s: %s, retrying in %.1f s",
+                    err.__class__.__name__,
+                    err,
+                    retry_delay,
+                )
+            else:
+                retry_delay = None
+                self._idle.set()
+
+            # mutations left pending are applied on the next start
+            if self._stopping.is_set():
+                return
+
+    def _apply_next_batch(self) -> bool:
+        with self._journal.connect() as connection:
+            mutations = connection.execute(
+                select(_mutation_table)
+                .where(_mutation_table.c.error.is_(None))
+                .order_by(_mutation_table.c.id)
+                .limit(self._batch_size)
+            ).all()
+
+        if not mutations:
+            return False
+
+        try:
+            self._apply(mutations)
+        except Exception as err:
+            if self._retry_later(err, mutations[0]):
+                raise
+
+            for mutation in mutations:
+                self._apply_single(mutation)
+        else:
+            self._forget(mutations)
+
+        return True
+
+    def _apply(self, mutations: list) -> None:
+        written = []
+
+        with Session(self._engine) as session:
+            for mutation in mutations:
+                repository = self._repositories[mutation.table_name]
+                data = None if mutation.payload is None else json.loads(mutation.payload)
+                _id = repository.apply_mutation(session, mutation.operation, mutation.record_id, data)
+                written.append((repository, _id, mutation.operation))
+
+            session.commit()
+
+        for repository, _id, operation in written:
+            repository.invalidate_cache(_id, cascade=operation == "delete")
+
+    def _apply_single(self, mutation) -> None:
+        try:
+            self._apply([mutation])
+        except Exception as err:
+            if self._retry_later(err, mutation):
+                raise
+
+            self._attempts.pop(mutation.id, None)
+            error = _to_infrastructure_error(err, mutation.table_name)
+
+            with self._journal.begin() as connection:
+                connection.execute(
+                    update(_mutation_table).where(_mutation_table.c.id == mutation.id).values(error=str(error))
+                )
+
+            data = None if mutation.payload is None else json.loads(mutation.payload)
+            self._failures.put(WriteFailure(mutation.table_name, mutation.operation, mutation.record_id, data, error))
+        else:
+            self._forget([mutation])
+
+    def _retry_later(self, err: Exception, mutation) -> bool:
+        """Whether the error is transient and the mutation has attempts left"""
+        if not _is_transient(err):
+            return False
+
+        self._attempts[mutation.id] = self._attempts.get(mutation.id, 0) + 1
+        return self._attempts[mutation.id] < self._max_attempts
+
+    def _forget(self, mutations: list) -> None:
+        for mutation in mutations:
+            self._attempts.pop(mutation.id, None)
+
+        with self._journal.begin() as connection:
+            connection.execute(delete(_mutation_table).where(_mutation_table.c.id.in_([row.id for row in mutations])))
+
+
+class WriteBehindRepository:
+    """Repository whose add, update and delete go through the queue, everything else is delegated as is"""
+
+    def __init__(self, repository: IRepository, write_queue: WriteBehindQueue) -> None:
+        self._repository = repository
+        self._queue = write_queue
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._repository, name)
+
+    def add(self, data: dict[str, Any]) -> None:
+        self._queue.submit(self._repository.table_name, "add", data.get("id"), data)
+
+    def update(self, _id: int, data: dict[str, Any]) -> None:
+        self._queue.submit(self._repository.table_name, "update", _id, data)
+
+    def delete(self, _id: int) -> None:
+        self._queue.submit(self._repository.table_name, "delete", _id)
+
+
+def _journal_engine_factory(journal_url: str) -> Engine:
+    engine = create_engine(journal_url)
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record) -> None:
+        # journal is written on every click, durable against crashes of the app is enough
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+    return engine
+
+
+def _is_transient(err: Exception) -> bool:
+    """Lost connections, deadlocks and lock timeouts, which applying the mutation again later may fix"""
+    if not isinstance(err, DBAPIError):
+        return False
+    if err.connection_invalidated:
+        return True
+
+    driver_error = err.orig
+    # psycopg2 and psycopg name the SQLSTATE differently
+    state = getattr(driver_error, "pgcode", None) or getattr(driver_error, "sqlstate", None)
+    if state is not None:
+        return state.startswith(_TRANSIENT_POSTGRES_STATES)
+
+    sqlite_code = getattr(driver_error, "sqlite_errorcode", None)
+    if sqlite_code is not None:
+        return sqlite_code & 0xFF in _TRANSIENT_SQLITE_ERRORS
+
+    # MySQL drivers pass the error number as the first argument
+    code = driver_error.args[0] if driver_error.args else None
+    return isinstance(code, int) and code in _TRANSIENT_MYSQL_ERRORS
+
+
+def _to_infrastructure_error(err: Exception, table_name: str) -> InfrastructureException:
+    if isinstance(err, IntegrityError):
+        return RelationError(f"Impossible to write this {table_name}")
+    if isinstance(err, DataError):
+        return InvalidDataError("Invalid input")
+
+    return InfrastructureException(f"Something went wrong with {err.__class__.__name__}: {str(err)}")
@@ -0,0 +1,30 @@
+import pytest
+from sqlalchemy import Engine
+
+from src.generator import generate_into_engine
+from src.templates import DatabaseTemplate
+
+
+# sizes of the generated shop, big enough for skewed aggregates and ties, small enough to build in seconds
+GENERATED_CUSTOMERS = 5_000
+GENERATED_PRODUCTS = 500
+GENERATED_ORDERS = 50_000
+
+
+@pytest.fixture(scope="session")
+def generated_template() -> DatabaseTemplate:
+    template = DatabaseTemplate(
+        lambda engine: generate_into_engine(
+            engine, GENERATED_CUSTOMERS, GENERATED_PRODUCTS, GENERATED_ORDERS, seed=1, workers=2
+        )
+    )
+    yield template
+    template.dispose()
+
+
+@pytest.fixture
+def generated_engine(generated_template: DatabaseTemplate) -> Engine:
+    """In-memory SQLite copy of the generated shop, tests may write to it"""
+    engine = generated_template.clone()
+    yield engine
+    engine.dispose()
@@ -0,0 +1,38 @@
+from src.cache import LRUCache
+
+
+def test_value_loaded_while_its_key_is_invalidated_is_not_cached() -> None:
+    cache = LRUCache()
+
+    def _load_while_written() -> str:
+        # a write of another thread lands while the loader reads
+        cache.invalidate(lambda key: key == "orders")
+        return "rows before the write"
+
+    assert cache.get_or_load("orders", _load_while_written) == "rows before the write"
+    assert cache.get_or_load("orders", lambda: "rows after the write") == "rows after the write"
+    assert cache.get("orders") == "rows after the write"
+
+
+def test_invalidation_of_other_keys_keeps_loaded_value() -> None:
+    cache = LRUCache()
+
+    def _load_while_other_written() -> str:
+        cache.invalidate(lambda key: key == "products")
+        return "rows"
+
+    cache.get_or_load("orders", _load_while_other_written)
+
+    assert cache.get("orders") == "rows"
+
+
+def test_failed_loader_leaves_no_loading_state() -> None:
+    cache = LRUCache()
+
+    try:
+        cache.get_or_load("orders", lambda: 1 / 0)
+    except ZeroDivisionError:
+        pass
+
+    assert cache.get_or_load("orders", lambda: "rows") == "rows"
+    assert cache.get("orders") == "rows"
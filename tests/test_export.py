@@ -0,0 +1,30 @@
+import pytest
+from sqlalchemy import Engine
+
+from src.cache import LRUCache
+from src.engines import memory_engine_factory
+from src.exceptions import RepeatedQueryError
+from src.export import export_data
+from src.repeated_queries import detect_repeated_queries
+from src.repositories import CustomerRepository, OrderRepository
+
+
+def test_export_of_generated_shop_issues_no_repeated_queries(generated_engine: Engine) -> None:
+    destination = memory_engine_factory()
+
+    try:
+        with detect_repeated_queries("export", fail=True):
+            export_data(generated_engine, destination)
+
+        assert OrderRepository(destination, LRUCache()).count() == OrderRepository(generated_engine, LRUCache()).count()
+    finally:
+        destination.dispose()
+
+
+def test_batched_method_called_per_row_is_repeated(generated_engine: Engine) -> None:
+    customers = CustomerRepository(generated_engine, LRUCache())
+
+    with pytest.raises(RepeatedQueryError, match=r"issued by CustomerRepository.upsert_many\n"):
+        with detect_repeated_queries("upsert per row", fail=True):
+            for _id in range(1, 30):
+                customers.upsert_many([{"id": _id, "full_name": f"Customer {_id}", "email": f"c{_id}@shop.com"}])
@@ -0,0 +1,57 @@
+import pytest
+from sqlalchemy import Engine, select
+from sqlalchemy.orm import Session
+
+import src.fuzzy
+from src.cache import LRUCache
+from src.config import FUZZY_MIN_SIMILARITY
+from src.fuzzy import fuzzy_search, similarity, trigrams
+from src.repositories import CustomerRepository
+from src.tables import Customer
+
+
+QUERIES = ["nick.shevchenko1234@dog.com", "Nik Shevchenko", "olena melnyk", "mari kovalenko 777", "com", "zzz"]
+
+
+def _brute_force(engine: Engine, query: str, limit: int) -> list[tuple[int, float]]:
+    query_trigrams = trigrams(query)
+
+    with Session(engine) as session:
+        customers = session.scalars(select(Customer)).all()
+
+    scored = []
+    for customer in customers:
+        score = max(similarity(query_trigrams, trigrams(value)) for value in (customer.full_name, customer.email))
+        if score >= FUZZY_MIN_SIMILARITY:
+            scored.append((customer.id, score))
+
+    return sorted(scored, key=lambda row: (-row[1], row[0]))[:limit]
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_fuzzy_search_finds_most_similar_customers(generated_engine: Engine, monkeypatch, query: str) -> None:
+    # every trigram is looked up in full, which makes the lookup exact
+    monkeypatch.setattr(src.fuzzy, "_FREQUENT_TRIGRAM_CUSTOMERS", 10 ** 9)
+
+    result = fuzzy_search(generated_engine, query, 10)
+
+    expected = _brute_force(generated_engine, query, 10)
+
+    assert [(row["id"], pytest.approx(row["similarity"])) for row in result] == expected
+
+
+@pytest.mark.parametrize("query", QUERIES)
+def test_fuzzy_search_with_frequent_trigrams(generated_engine: Engine, query: str) -> None:
+    result = fuzzy_search(generated_engine, query, 10)
+    expected = dict(_brute_force(generated_engine, query, 10 ** 9))
+
+    assert len(result) == min(10, len(expected))
+    assert all(row["similarity"] == pytest.approx(expected[row["id"]]) for row in result)
+    assert [row["similarity"] for row in result] == sorted((row["similarity"] for row in result), reverse=True)
+
+
+def test_fuzzy_search_finds_customers_upserted_without_id(generated_engine: Engine) -> None:
+    customers = CustomerRepository(generated_engine, LRUCache())
+    customers.upsert_many([{"full_name": "Zoryana Quintessence", "email": "zoryana.q@shop.ua"}])
+
+    assert fuzzy_search(generated_engine, "zoryana quintesence", 1)[0]["full_name"] == "Zoryana Quintessence"
@@ -0,0 +1,17 @@
+import json
+
+from benchmarks.plans import capture_plans, check, plan_engine, snapshot_path
+
+
+def test_sqlite_plans_match_approved_snapshot() -> None:
+    engine = plan_engine("sqlite")
+
+    try:
+        plans = capture_plans(engine)
+        snapshot = json.loads(snapshot_path(engine).read_text())
+    finally:
+        engine.dispose()
+
+    # after an intended change of queries or indexes, approve plans again with python -m benchmarks.plans approve
+    problems = check(plans, snapshot)
+    assert not problems, "\n\n".join(problems)
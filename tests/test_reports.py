@@ -0,0 +1,157 @@
+import bisect
+from collections import defaultdict
+from typing import Any
+
+import pytest
+from sqlalchemy import Engine, select
+from sqlalchemy.orm import Session
+
+from src.cache import LRUCache
+from src.reports import IdRange, OrderReports, reports_cache
+from src.repositories import CustomerRepository, OrderRepository
+from src.tables import Customer, Order, Product
+
+
+RANGES = [
+    {},
+    {"order_ids": (1_000, 30_000)},
+    {"customer_ids": (1, 500), "product_ids": (10, 400)},
+]
+
+
+def _totals(
+    shop: dict[str, Any],
+    key: str,
+    order_ids: IdRange | None = None,
+    customer_ids: IdRange | None = None,
+    product_ids: IdRange | None = None,
+) -> dict[int, dict[str, Any]]:
+    """Order count, quantity and revenue per customer or product, computed in Python over ORM rows"""
+    prices = {product.id: product.price for product in shop["products"]}
+
+    totals = defaultdict(lambda: {"order_count": 0, "total_qty": 0, "revenue": 0.0})
+    for order in shop["orders"]:
+        ranges = ((order.id, order_ids), (order.customer_id, customer_ids), (order.product_id, product_ids))
+        if any(id_range is not None and not id_range[0] <= value <= id_range[1] for value, id_range in ranges):
+            continue
+
+        row = totals[getattr(order, key)]
+        row["order_count"] += 1
+        row["total_qty"] += order.qty
+        row["revenue"] += order.qty * prices[order.product_id]
+
+    return totals
+
+
+def _ranks(totals: dict[int, dict[str, Any]], rank_by: str) -> dict[int, int]:
+    """Same as RANK() by `rank_by` descending, one plus the number of rows with a greater value"""
+    values = sorted(row[rank_by] for row in totals.values())
+    return {_id: 1 + len(values) - bisect.bisect_right(values, row[rank_by]) for _id, row in totals.items()}
+
+
+def _assert_matches(report: list[dict[str, Any]], totals: dict[int, dict[str, Any]], key: str, rank_by: str) -> None:
+    assert sorted(row[key] for row in report) == sorted(totals)
+
+    total = sum(row[rank_by] for row in totals.values())
+    ranks = _ranks(totals, rank_by)
+
+    for row in report:
+        expected = totals[row[key]]
+        assert row["order_count"] == expected["order_count"]
+        assert row["total_qty"] == expected["total_qty"]
+        assert row["revenue"] == pytest.approx(expected["revenue"])
+        assert row["share"] == pytest.approx(expected[rank_by] / total)
+        assert row["rank"] == ranks[row[key]]
+
+    assert [row[rank_by] for row in report] == sorted((row[rank_by] for row in report), reverse=True)
+
+
+@pytest.fixture(scope="module")
+def engine(generated_template) -> Engine:
+    # one engine per module, reports are read only here
+    engine = generated_template.clone()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def shop(engine: Engine) -> dict[str, Any]:
+    with Session(engine) as session:
+        return {
+            "customers": session.scalars(select(Customer)).all(),
+            "products": session.scalars(select(Product)).all(),
+            "orders": session.scalars(select(Order)).all(),
+        }
+
+
+@pytest.mark.parametrize("ranges", RANGES)
+def test_revenue_per_product(engine: Engine, shop: dict[str, Any], ranges: dict[str, Any]) -> None:
+    report = OrderReports(engine, LRUCache()).revenue_per_product(**ranges)
+
+    _assert_matches(report, _totals(shop, "product_id", **ranges), "product_id", "revenue")
+
+
+@pytest.mark.parametrize("ranges", RANGES)
+def test_orders_per_customer(engine: Engine, shop: dict[str, Any], ranges: dict[str, Any]) -> None:
+    report = OrderReports(engine, LRUCache()).orders_per_customer(**ranges)
+
+    _assert_matches(report, _totals(shop, "customer_id", **ranges), "customer_id", "order_count")
+
+    customers = {customer.id: customer for customer in shop["customers"]}
+
+    for row in report:
+        customer = customers[row["customer_id"]]
+        assert (row["full_name"], row["email"]) == (customer.full_name, customer.email)
+
+
+@pytest.mark.parametrize("ranges", RANGES)
+@pytest.mark.parametrize("limit", [1, 10, 100])
+def test_top_customers(engine: Engine, shop: dict[str, Any], ranges: dict[str, Any], limit: int) -> None:
+    report = OrderReports(engine, LRUCache()).top_customers(limit, **ranges)
+
+    totals = _totals(shop, "customer_id", **ranges)
+    ranks = _ranks(totals, "revenue")
+    expected_ids = sorted(_id for _id, rank in ranks.items() if rank <= limit)
+
+    assert sorted(row["customer_id"] for row in report) == expected_ids
+    assert len(report) >= limit
+
+    for row in report:
+        assert row["revenue"] == pytest.approx(totals[row["customer_id"]]["revenue"])
+        assert row["rank"] == ranks[row["customer_id"]]
+
+
+def test_reports_are_recomputed_after_repository_writes(generated_engine: Engine) -> None:
+    reports_cache.clear()
+    reports = OrderReports(generated_engine)
+    orders = OrderRepository(generated_engine, LRUCache())
+
+    before = {row["product_id"]: row for row in reports.revenue_per_product()}
+    orders.add({"customer_id": 1, "product_id": 1, "qty": 5})
+    after = {row["product_id"]: row for row in reports.revenue_per_product()}
+
+    assert after[1]["order_count"] == before[1]["order_count"] + 1
+    assert after[1]["total_qty"] == before[1]["total_qty"] + 5
+
+
+def test_reports_in_repository_cache_are_recomputed_after_writes(generated_engine: Engine) -> None:
+    cache = LRUCache()
+    reports = OrderReports(generated_engine, cache)
+    customers = CustomerRepository(generated_engine, cache)
+
+    reports.orders_per_customer(customer_ids=(1, 1))
+    customers.update(1, {"full_name": "Renamed Customer"})
+
+    assert reports.orders_per_customer(customer_ids=(1, 1))[0]["full_name"] == "Renamed Customer"
+
+
+def test_changing_returned_rows_leaves_cached_report_intact(generated_engine: Engine) -> None:
+    reports = OrderReports(generated_engine, LRUCache())
+
+    for report in (reports.revenue_per_product, lambda: reports.top_customers(3)):
+        rows = report()
+        expected = [dict(row) for row in rows]
+        rows[0]["revenue"] = -1
+        rows.pop()
+
+        assert report() == expected
@@ -0,0 +1,23 @@
+from sqlalchemy import Engine, text
+
+from src.cache import LRUCache
+from src.repositories import CustomerRepository, ProductRepository
+from src.schema import ensure_schema
+from src.search import search_index_names
+from src.stats import STATS_TABLES
+
+
+def test_ensure_schema_fills_derived_tables_of_existing_database(generated_engine: Engine) -> None:
+    # database of a version without stats, trigrams and full text indexes
+    with generated_engine.begin() as connection:
+        for table_name in (*STATS_TABLES, "customer_trigram", *search_index_names()):
+            connection.execute(text(f"DROP TABLE {table_name}"))
+
+    assert ensure_schema(generated_engine)
+    assert not ensure_schema(generated_engine)
+
+    customers = CustomerRepository(generated_engine, LRUCache())
+    assert customers.get_stats(1)["order_count"] > 0
+    assert customers.fuzzy_search("nick shevchenko")
+    assert customers.search("nick")
+    assert ProductRepository(generated_engine, LRUCache()).search("ball")
@@ -0,0 +1,71 @@
+from typing import Any
+
+import pytest
+from sqlalchemy import Engine, event, select
+from sqlalchemy.orm import Session
+
+from src.cache import LRUCache
+from src.repositories import CustomerRepository, OrderRepository, ProductRepository
+from src.stats import rebuild_stats
+from src.tables import CustomerOrderStats, ProductSalesStats
+
+
+def _stats(engine: Engine) -> dict[str, dict[int, tuple[Any, ...]]]:
+    with Session(engine) as session:
+        return {
+            stats_table.__tablename__: {
+                row.id: (row.order_count, row.total_qty, pytest.approx(row.revenue))
+                for row in session.scalars(select(stats_table))
+                if row.order_count
+            }
+            for stats_table in (CustomerOrderStats, ProductSalesStats)
+        }
+
+
+def test_maintained_stats_match_rebuilt_ones(generated_engine: Engine) -> None:
+    orders = OrderRepository(generated_engine, LRUCache())
+    products = ProductRepository(generated_engine, LRUCache())
+    customers = CustomerRepository(generated_engine, LRUCache())
+
+    orders.add({"customer_id": 3, "product_id": 7, "qty": 4})
+    orders.update(10, {"qty": 9, "product_id": 8})
+    orders.delete(11)
+    orders.upsert_many([
+        {"id": 12, "qty": 2, "customer_id": 5, "product_id": 1},
+        {"id": 13, "qty": 1, "customer_id": 5, "product_id": 1},
+    ])
+    products.update(1, {"price": 123.45})
+    products.upsert_many([{"id": 2, "name": "Renamed", "price": 1.5, "description": None}])
+    customers.delete(1)
+
+    maintained = _stats(generated_engine)
+    rebuild_stats(generated_engine)
+
+    assert maintained == _stats(generated_engine)
+
+
+def test_writes_of_other_columns_leave_stats_untouched(generated_engine: Engine) -> None:
+    statements = []
+    event.listen(generated_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    ProductRepository(generated_engine, LRUCache()).update(1, {"name": "Renamed", "description": "Same price"})
+    CustomerRepository(generated_engine, LRUCache()).update(1, {"full_name": "Renamed Customer"})
+
+    assert not [statement for statement in statements if "_stats" in statement or 'FROM "order"' in statement]
+
+
+def test_upserted_records_without_id_are_counted(generated_engine: Engine) -> None:
+    orders = OrderRepository(generated_engine, LRUCache())
+    before = CustomerRepository(generated_engine, LRUCache()).get_stats(1)["order_count"]
+
+    orders.upsert_many([
+        {"customer_id": 1, "product_id": 1, "qty": 5},
+        {"id": None, "customer_id": 1, "product_id": 2, "qty": 1},
+        {"id": 14, "qty": 3, "customer_id": 1, "product_id": 1},
+    ])
+
+    maintained = _stats(generated_engine)
+    assert CustomerRepository(generated_engine, LRUCache()).get_stats(1)["order_count"] > before
+
+    rebuild_stats(generated_engine)
+    assert maintained == _stats(generated_engine)
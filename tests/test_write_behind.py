@@ -0,0 +1,104 @@
+import pytest
+from sqlalchemy import Engine
+from sqlalchemy.exc import OperationalError
+
+import src.write_behind
+from src.cache import LRUCache
+from src.exceptions import RelationError
+from src.repositories import OrderRepository, ProductRepository
+from src.write_behind import WriteBehindQueue, WriteBehindRepository
+
+
+@pytest.fixture
+def write_queue(generated_engine: Engine, tmp_path, monkeypatch) -> WriteBehindQueue:
+    monkeypatch.setattr(src.write_behind, "WRITE_BEHIND_RETRY_INITIAL_SECONDS", 0.01)
+    monkeypatch.setattr(src.write_behind, "WRITE_BEHIND_RETRY_MAX_SECONDS", 0.05)
+
+    repositories = [ProductRepository(generated_engine, LRUCache()), OrderRepository(generated_engine, LRUCache())]
+    write_queue = WriteBehindQueue(
+        repositories, f"sqlite:///{tmp_path / 'journal.sqlite'}", flush_interval=0.01, max_attempts=5
+    )
+    write_queue.start()
+    yield write_queue
+    write_queue.stop()
+
+
+def _fail_first_calls(monkeypatch, method_name: str, calls: int, error: Exception) -> None:
+    original = getattr(WriteBehindQueue, method_name)
+    remaining = [calls]
+
+    def _failing(self, *args, **kwargs):
+        if remaining[0]:
+            remaining[0] -= 1
+            raise error
+
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(WriteBehindQueue, method_name, _failing)
+
+
+def test_transient_errors_are_retried(write_queue: WriteBehindQueue, generated_engine: Engine, monkeypatch) -> None:
+    lost_connection = OperationalError("INSERT", {}, Exception(2013, "Lost connection to MySQL server during query"))
+    _fail_first_calls(monkeypatch, "_apply", 3, lost_connection)
+    products = WriteBehindRepository(ProductRepository(generated_engine), write_queue)
+
+    products.update(1, {"name": "Renamed"})
+
+    assert write_queue.flush(timeout=5)
+    assert write_queue.failures() == []
+    assert write_queue.pending_count() == 0
+    assert ProductRepository(generated_engine).get_one(1)["name"] == "Renamed"
+
+
+def test_worker_survives_journal_errors(write_queue: WriteBehindQueue, generated_engine: Engine, monkeypatch) -> None:
+    _fail_first_calls(monkeypatch, "_apply_next_batch", 2, OperationalError("SELECT", {}, Exception("database is locked")))
+    products = WriteBehindRepository(ProductRepository(generated_engine), write_queue)
+
+    products.update(2, {"name": "Renamed"})
+
+    assert write_queue.flush(timeout=5)
+    assert ProductRepository(generated_engine).get_one(2)["name"] == "Renamed"
+
+
+def test_integrity_errors_are_reported_as_failures(write_queue: WriteBehindQueue, generated_engine: Engine) -> None:
+    orders = WriteBehindRepository(OrderRepository(generated_engine), write_queue)
+
+    orders.add({"customer_id": 10 ** 9, "product_id": 1, "qty": 1})
+    orders.add({"customer_id": 1, "product_id": 1, "qty": 1})
+
+    assert write_queue.flush(timeout=5)
+    failures = write_queue.failures()
+
+    assert [failure.data["customer_id"] for failure in failures] == [10 ** 9]
+    assert isinstance(failures[0].error, RelationError)
+    assert write_queue.pending_count() == 0
+
+
+def test_errors_of_the_mutation_are_not_retried(
+    write_queue: WriteBehindQueue, generated_engine: Engine, monkeypatch
+) -> None:
+    # MySQL reports a violated check constraint as OperationalError
+    check_violation = OperationalError("UPDATE", {}, Exception(3819, "Check constraint 'qty_positive' is violated"))
+    _fail_first_calls(monkeypatch, "_apply", 2, check_violation)
+    products = WriteBehindRepository(ProductRepository(generated_engine), write_queue)
+
+    products.update(3, {"name": "Renamed"})
+
+    assert write_queue.flush(timeout=5)
+    assert [failure.record_id for failure in write_queue.failures()] == [3]
+    assert write_queue.pending_count() == 0
+
+
+def test_transient_errors_are_reported_after_last_attempt(
+    write_queue: WriteBehindQueue, generated_engine: Engine, monkeypatch
+) -> None:
+    deadlock = OperationalError("UPDATE", {}, Exception(1213, "Deadlock found when trying to get lock"))
+    _fail_first_calls(monkeypatch, "_apply", 6, deadlock)
+    products = WriteBehindRepository(ProductRepository(generated_engine), write_queue)
+
+    products.update(4, {"name": "Renamed"})
+    products.update(5, {"name": "Renamed"})
+
+    assert write_queue.flush(timeout=5)
+    assert [failure.record_id for failure in write_queue.failures()] == [4]
+    assert ProductRepository(generated_engine).get_one(5)["name"] == "Renamed"